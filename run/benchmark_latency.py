@@ -0,0 +1,80 @@
+# SPDX-License-Identifier: BSD-3-Clause
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+# Run in a fresh interpreter: time the creation of the engine (which loads or
+# compiles the kernels), and the first iterations of a game with idle bots.
+LATENCY = """
+import time
+import types
+
+import numpy as np
+
+import cholerama
+from cholerama.engine import Engine, setup
+
+
+class Bot:
+    def __init__(self, number, name, patch_location, patch_size):
+        self.number = number
+        self.name = name
+        self.color = None
+        self.pattern = cholerama.Positions(x=np.arange(10), y=np.zeros(10, dtype=int))
+
+    def iterate(self, **kwargs):
+        return None
+
+
+bots = {{f"bot{{i}}": types.SimpleNamespace(Bot=Bot) for i in range({players})}}
+buffers, players, dict_of_bots = setup(bots=bots, iterations=10)
+start = time.perf_counter()
+engine = Engine(
+    bots=dict_of_bots,
+    players=players,
+    iterations=10,
+    buffers=buffers,
+    verbose=False,
+    kernel="{kernel}",
+)
+times = [time.perf_counter() - start]
+for it in (1, 2):
+    start = time.perf_counter()
+    engine.update(it)
+    times.append(time.perf_counter() - start)
+print(*times)
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Time the first iterations of a game, with an empty (cold) "
+        "and a filled (warm) numba cache."
+    )
+    parser.add_argument("--players", type=int, default=16)
+    parser.add_argument("--kernel", type=str, default="modulo")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    code = LATENCY.format(players=args.players, kernel=args.kernel)
+    print(f"{'':6}{'engine':>10}{'iteration 1':>14}{'iteration 2':>14}")
+    with tempfile.TemporaryDirectory() as cache:
+        env = dict(os.environ, NUMBA_CACHE_DIR=cache)
+        for label in ("cold", "warm"):
+            out = subprocess.run(
+                [sys.executable, "-c", code],
+                capture_output=True,
+                text=True,
+                check=True,
+                env=env,
+            ).stdout.split()
+            engine, first, second = (float(t) for t in out)
+            print(f"{label:6}{engine:9.3f}s{first:13.3f}s{second:13.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# SPDX-License-Identifier: BSD-3-Clause
+import argparse
+import statistics
+import subprocess
+import sys
+
+# Run in a fresh interpreter: import the package, and set up a headless game with
+# idle bots, up to the point where the first iteration can be played.
+STARTUP = """
+import sys
+import time
+
+start = time.perf_counter()
+import types
+
+import numpy as np
+
+import cholerama
+from cholerama.engine import Engine, setup
+
+imported = time.perf_counter()
+
+
+class Bot:
+    def __init__(self, number, name, patch_location, patch_size):
+        self.number = number
+        self.name = name
+        self.color = None
+        self.pattern = cholerama.Positions(x=np.arange(10), y=np.zeros(10, dtype=int))
+
+    def iterate(self, **kwargs):
+        return None
+
+
+bots = {{f"bot{{i}}": types.SimpleNamespace(Bot=Bot) for i in range({players})}}
+buffers, players, dict_of_bots = setup(bots=bots, iterations={iterations})
+engine = Engine(
+    bots=dict_of_bots,
+    players=players,
+    iterations={iterations},
+    buffers=buffers,
+    verbose=False,
+)
+ready = time.perf_counter()
+heavy = [m for m in {heavy} if m in sys.modules]
+print(imported - start, ready - imported, ",".join(heavy))
+"""
+
+# Modules that a headless run should never import
+HEAVY = ("matplotlib", "pyqtgraph", "PyQt5", "PySide2", "PIL")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Time 'import cholerama' and the setup of a headless game."
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--players", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=4000)
+    parser.add_argument(
+        "--target", type=float, default=1.5, help="Maximum median time (s)."
+    )
+    return parser.parse_args()
+
+
+def run_once(code):
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout.split()
+    return float(out[0]), float(out[1]), out[2:]
+
+
+def main():
+    args = parse_args()
+    code = STARTUP.format(players=args.players, iterations=args.iterations, heavy=HEAVY)
+    # The first run fills the numba cache, it is not counted
+    run_once(code)
+    runs = [run_once(code) for _ in range(args.runs)]
+    imports = statistics.median(r[0] for r in runs)
+    setups = statistics.median(r[1] for r in runs)
+    total = statistics.median(r[0] + r[1] for r in runs)
+    heavy = sorted(set(m for r in runs for m in r[2]))
+    print(f"import cholerama: {imports:.3f}s")
+    print(f"headless setup:   {setups:.3f}s")
+    print(f"total:            {total:.3f}s (target: {args.target:.3f}s)")
+    ok = total <= args.target
+    if heavy:
+        print("Imported by a headless run:", ", ".join(heavy))
+        ok = False
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
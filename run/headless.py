@@ -23,4 +23,6 @@ cholerama.headless(
     bots=bots,  # List of bots to use
     iterations=4000,  # Number of iterations to run
     show_results=False,  # Display plot of results at the end
+    results="npz",  # Where to write the results: "npz", "record" or None
+    pdf=False,  # Save a plot of the results as a PDF
 )
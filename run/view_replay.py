@@ -0,0 +1,25 @@
+# SPDX-License-Identifier: BSD-3-Clause
+import argparse
+import glob
+import os
+
+from cholerama import replay
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", type=str, default=None, nargs="?")
+    parser.add_argument("--fps", type=int, default=30)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    file = args.file
+    if file is None:
+        file = max(glob.glob("*.rec"), key=os.path.getmtime)
+    replay(file, fps=args.fps)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,41 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
-from .config import config
+from .batch import BatchEngine
+from .config import Config, config
 from .engine import Engine, setup
-from .helpers import Positions
-from .main import play
+from .environment import Environment
+from .helpers import Positions, Sleep
+from .main import play, replay
 from .plot import load, plot
+from .tournament import tournament
 
 
-def headless(*, bots, iterations, seed=None, show_results=False, **kwargs):
-    buffers, players, dict_of_bots = setup(bots=bots, iterations=iterations, seed=seed)
+def headless(*, bots, iterations, seed=None, show_results=False, config=None, **kwargs):
+    buffers, players, dict_of_bots = setup(
+        bots=bots, iterations=iterations, seed=seed, config=config
+    )
     eng = Engine(
         bots=dict_of_bots,
         players=players,
         iterations=iterations,
         buffers=buffers,
+        config=config,
         **kwargs,
     )
     return eng.run(show_results)
 
 
-__all__ = ["play", "headless", "config", "load", "plot", "Positions"]
+__all__ = [
+    "BatchEngine",
+    "Environment",
+    "play",
+    "replay",
+    "headless",
+    "tournament",
+    "config",
+    "Config",
+    "load",
+    "plot",
+    "Positions",
+    "Sleep",
+]
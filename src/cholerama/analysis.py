@@ -0,0 +1,141 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import inspect
+from typing import Dict
+
+import numpy as np
+from numba import njit, prange
+
+from .helpers import EmptyRegions
+
+
+@njit(boundscheck=False, cache=True, fastmath=True, parallel=True)
+def analyse_board(board: np.ndarray, neighbors: np.ndarray, contested: np.ndarray):
+    """
+    Count the alive neighbours of every cell (periodic boundaries), and flag the
+    alive cells that have at least one neighbour owned by another player.
+    """
+    ny, nx = board.shape
+    for j in prange(ny):
+        above = board[j - 1 if j > 0 else ny - 1]
+        row = board[j]
+        below = board[j + 1 if j < ny - 1 else 0]
+        # Same column sums as in _evolve_row, with a ghost column on each side
+        cols = np.empty(nx + 2, dtype=np.uint8)
+        for i in range(nx):
+            cols[i + 1] = (above[i] > 0) + (row[i] > 0) + (below[i] > 0)
+        cols[0] = cols[nx]
+        cols[nx + 1] = cols[1]
+        for i in range(nx):
+            owner = row[i]
+            count = cols[i] + cols[i + 1] + cols[i + 2] - (owner > 0)
+            neighbors[j, i] = count
+            contested[j, i] = False
+            if (owner > 0) and (count > 0):
+                im = i - 1 if i > 0 else nx - 1
+                ip = i + 1 if i < nx - 1 else 0
+                for n in (
+                    above[im],
+                    above[i],
+                    above[ip],
+                    row[im],
+                    row[ip],
+                    below[im],
+                    below[i],
+                    below[ip],
+                ):
+                    if (n > 0) and (n != owner):
+                        contested[j, i] = True
+
+
+def wants_analysis(bot) -> bool:
+    """
+    Whether the ``iterate`` method of a bot accepts an ``analysis`` argument.
+    """
+    parameters = inspect.signature(bot.iterate).parameters.values()
+    return any((p.name == "analysis") or (p.kind == p.VAR_KEYWORD) for p in parameters)
+
+
+class BoardAnalysis:
+    """
+    Information about the board that many bots compute for themselves, computed
+    once per iteration and shared by all the bots. Nothing is computed until a
+    bot asks for it, and the results are kept for the other bots. All the
+    returned arrays are read-only.
+
+    Parameters
+    ----------
+    board:
+        The board handed to the bots.
+    patches:
+        The patch bounds of each player, by player number.
+    """
+
+    def __init__(self, board: np.ndarray, patches: Dict[int, Dict[str, int]]):
+        self.board = board
+        self.patches = patches
+        self._neighbors = None
+        self._contested = None
+        self._masks = {}
+        self._empty = {}
+
+    @staticmethod
+    def _frozen(array: np.ndarray) -> np.ndarray:
+        array.setflags(write=False)
+        return array
+
+    def _analyse(self):
+        neighbors = np.empty(self.board.shape, dtype=np.uint8)
+        contested = np.empty(self.board.shape, dtype=bool)
+        analyse_board(self.board, neighbors, contested)
+        self._neighbors = self._frozen(neighbors)
+        self._contested = self._frozen(contested)
+
+    @property
+    def neighbors(self) -> np.ndarray:
+        """
+        Number of alive neighbours of every cell.
+        """
+        if self._neighbors is None:
+            self._analyse()
+        return self._neighbors
+
+    @property
+    def contested(self) -> np.ndarray:
+        """
+        Alive cells that have at least one neighbour owned by another player.
+        """
+        if self._contested is None:
+            self._analyse()
+        return self._contested
+
+    def mask(self, number: int) -> np.ndarray:
+        """
+        Cells owned by player ``number``.
+        """
+        if number not in self._masks:
+            self._masks[number] = self._frozen(self.board == number)
+        return self._masks[number]
+
+    def frontier(self, number: int) -> np.ndarray:
+        """
+        Cells of player ``number`` that are next to a cell of another player.
+        """
+        return self._frozen(self.contested & self.mask(number))
+
+    def patch(self, number: int) -> np.ndarray:
+        """
+        The patch of player ``number``.
+        """
+        b = self.patches[number]
+        return self.board[b["ymin"] : b["ymax"], b["xmin"] : b["xmax"]]
+
+    def empty(self, number: int) -> EmptyRegions:
+        """
+        The empty regions in the patch of player ``number`` (see
+        ``helpers.EmptyRegions``), in patch coordinates. They are shared with
+        the other bots, and must not be updated.
+        """
+        if number not in self._empty:
+            self._empty[number] = EmptyRegions(self.patch(number))
+        return self._empty[number]
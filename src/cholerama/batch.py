@@ -0,0 +1,150 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+from typing import Optional
+
+import numpy as np
+from numba import njit, prange
+
+from .compute import _evolve_row
+from .tools import board_dtype
+
+
+@njit(boundscheck=False, cache=True, fastmath=True, parallel=True)
+def count_boards(boards: np.ndarray, cell_counts: np.ndarray):
+    """
+    Count the alive cells of each player (columns of ``cell_counts``) on each
+    board of the stack ``boards`` (rows of ``cell_counts``).
+    """
+    ngames, ny, nx = boards.shape
+    for g in prange(ngames):
+        tally = np.zeros(cell_counts.shape[1] + 1, dtype=np.int64)
+        for j in range(ny):
+            for i in range(nx):
+                tally[boards[g, j, i]] += 1
+        cell_counts[g] = tally[1:]
+
+
+@njit(boundscheck=False, cache=True, fastmath=True, parallel=True)
+def evolve_boards(old: np.ndarray, new: np.ndarray, cell_counts: np.ndarray):
+    """
+    Evolve a stack of independent boards of shape (games, ny, nx) by one step,
+    with the same rules as evolve_board. The games are spread over the threads,
+    and ``cell_counts`` (games, players) receives the number of alive cells of
+    each player on the new boards.
+    """
+    ngames, ny, nx = old.shape
+    for g in prange(ngames):
+        cols = np.empty(nx + 2, dtype=np.uint8)
+        counts = np.empty(nx, dtype=np.uint8)
+        tally = np.zeros(cell_counts.shape[1] + 1, dtype=np.int64)
+        for j in range(ny):
+            _evolve_row(
+                old[g, j - 1 if j > 0 else ny - 1],
+                old[g, j],
+                old[g, j + 1 if j < ny - 1 else 0],
+                new[g, j],
+                0,
+                nx,
+                cols,
+                counts,
+            )
+            for i in range(nx):
+                tally[new[g, j, i]] += 1
+        cell_counts[g] = tally[1:]
+
+
+class BatchEngine:
+    """
+    Evolves many independent games at once, for instance to evaluate opening
+    patterns on small boards. There are no bots: cells are placed for all the
+    games with ``place``, and the games are evolved with ``step``.
+
+    Parameters
+    ----------
+    boards:
+        Stack of starting boards, of shape (games, ny, nx).
+    nplayers:
+        Number of players. Defaults to the largest player number on the boards.
+    tokens:
+        Tokens of each player in each game, of shape (games, players). If
+        ``None``, placements are not limited by tokens.
+    """
+
+    def __init__(
+        self,
+        boards: np.ndarray,
+        nplayers: Optional[int] = None,
+        tokens: Optional[np.ndarray] = None,
+    ):
+        if boards.ndim != 3:
+            raise ValueError(
+                f"Boards must have shape (games, ny, nx), got {boards.shape}."
+            )
+        if nplayers is None:
+            nplayers = int(boards.max())
+        self.nplayers = nplayers
+        self.board_old = np.ascontiguousarray(boards, dtype=board_dtype(nplayers))
+        self.board_new = np.empty_like(self.board_old)
+        self.cell_counts = np.zeros((len(boards), nplayers), dtype=int)
+        self.tokens = None if tokens is None else np.array(tokens, dtype=int)
+        self.iteration = 0
+        count_boards(self.board_old, self.cell_counts)
+
+    @property
+    def boards(self) -> np.ndarray:
+        return self.board_old
+
+    def step(self, n: int = 1) -> np.ndarray:
+        """
+        Evolve all the games by ``n`` steps, and return the number of alive
+        cells of each player in each game, of shape (games, players).
+        """
+        for _ in range(n):
+            evolve_boards(self.board_old, self.board_new, self.cell_counts)
+            self.board_old, self.board_new = self.board_new, self.board_old
+            self.iteration += 1
+        return self.cell_counts
+
+    def place(
+        self, game: np.ndarray, x: np.ndarray, y: np.ndarray, player: np.ndarray
+    ) -> np.ndarray:
+        """
+        Place new cells in all the games at once. Cell ``k`` goes to board
+        ``game[k]`` at (``x[k]``, ``y[k]``) (periodic board coordinates), for
+        player number ``player[k]``.
+
+        As in the Engine, all the cells of a player in a game are rejected if
+        one of them would overwrite an alive cell, or if the player does not
+        have enough tokens. The players are placed in the order of their
+        numbers, so that a cell wanted by two players goes to the first one.
+        Returns whether each cell was placed.
+        """
+        game, x, y, player = np.broadcast_arrays(
+            np.asarray(game), np.asarray(x), np.asarray(y), np.asarray(player)
+        )
+        ngames, ny, nx = self.board_old.shape
+        x = x % nx
+        y = y % ny
+        placed = np.zeros(game.shape, dtype=bool)
+        for number in range(1, self.nplayers + 1):
+            cells = np.nonzero(player == number)[0]
+            if len(cells) == 0:
+                continue
+            g = game[cells]
+            needed = np.bincount(g, minlength=ngames)
+            taken = np.bincount(
+                g, weights=self.board_old[g, y[cells], x[cells]] > 0, minlength=ngames
+            )
+            ok = taken == 0
+            if self.tokens is not None:
+                ok &= needed <= self.tokens[:, number - 1]
+                self.tokens[:, number - 1] -= needed * ok
+            cells = cells[ok[g]]
+            placed[cells] = True
+            self.board_old[game[cells], y[cells], x[cells]] = number
+            # Count each new cell once
+            added = np.unique((game[cells] * ny + y[cells]) * nx + x[cells])
+            self.cell_counts[:, number - 1] += np.bincount(
+                added // (ny * nx), minlength=ngames
+            )
+        return placed
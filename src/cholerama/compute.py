@@ -1,8 +1,144 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
+from typing import Sequence
+
 import numpy as np
 from numba import njit, prange
 
+# Per-player statistics computed by the kernels, in addition to the cell counts
+STATS = ("births", "deaths", "inside", "outside")
+
+# The kernels split the rows into (at most) this many blocks, each with its own
+# work buffers and per-player tallies
+NBLOCKS = 256
+
+# Masks and multipliers used to pack 8 (uint8) or 4 (uint16) cells of a 64-bit
+# lane into bits, and to spread bits back over the cells of a lane (see
+# pack_board and _lane_mask)
+LOW_7 = np.uint64(0x7F7F7F7F7F7F7F7F)
+HIGH_8 = np.uint64(0x8080808080808080)
+GATHER_8 = np.uint64(0x0102040810204080)
+REPEAT_8 = np.uint64(0x0101010101010101)
+SPREAD_8 = np.uint64(0x8040201008040201)
+LOW_15 = np.uint64(0x7FFF7FFF7FFF7FFF)
+HIGH_16 = np.uint64(0x8000800080008000)
+GATHER_16 = np.uint64(0x1000200040008000)
+REPEAT_16 = np.uint64(0x0001000100010001)
+SPREAD_16 = np.uint64(0x0008000400020001)
+
+
+@njit(boundscheck=False, cache=True, fastmath=True)
+def cell_hash(index: int, owner: int) -> np.uint64:
+    """
+    Zobrist-style hash key of a cell owned by a player: the board hash is the
+    XOR of the keys of all the alive cells. Instead of a table of random keys,
+    the key is the splitmix64 mix of the cell index and the owner.
+    """
+    if owner == 0:
+        return np.uint64(0)
+    z = (np.uint64(index) << np.uint64(16)) | np.uint64(owner)
+    z += np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+@njit(boundscheck=False, cache=True, fastmath=True)
+def hash_cells(indices: np.ndarray, owners: np.ndarray) -> np.uint64:
+    """
+    XOR of the hash keys of the cells at the given flat indices.
+    """
+    h = np.uint64(0)
+    for k in range(len(indices)):
+        h ^= cell_hash(indices[k], owners[k])
+    return h
+
+
+@njit(boundscheck=False, cache=True, fastmath=True, parallel=True)
+def hash_board(board: np.ndarray) -> np.uint64:
+    """
+    Hash of a whole board.
+    """
+    ny, nx = board.shape
+    hashes = np.zeros(ny, dtype=np.uint64)
+    for j in prange(ny):
+        for i in range(nx):
+            hashes[j] ^= cell_hash(j * nx + i, board[j, i])
+    h = np.uint64(0)
+    for j in range(ny):
+        h ^= hashes[j]
+    return h
+
+
+@njit(boundscheck=False, cache=True, fastmath=True)
+def _patch_owner(patch_owners: np.ndarray, j: int, i: int, nx: int, ny: int):
+    # Number of the player whose starting patch contains cell (j, i), 0 if none
+    npy, npx = patch_owners.shape
+    py = j // (ny // npy)
+    px = i // (nx // npx)
+    if (py < npy) and (px < npx):
+        return patch_owners[py, px]
+    return 0
+
+
+@njit(boundscheck=False, cache=True, fastmath=True)
+def _tally_row(
+    row: np.ndarray,
+    out: np.ndarray,
+    i0: int,
+    i1: int,
+    j: int,
+    patch_owners: np.ndarray,
+    ny: int,
+    tally: np.ndarray,
+):
+    # Add the alive cells, births, deaths and cells inside the owner's patch of
+    # the cells i0 to i1 of an evolved row to the tally. Column 0 of the tally
+    # (empty cells) is scratch space. Returns the change in the board hash.
+    nx = len(row)
+    h = np.uint64(0)
+    for i in range(i0, i1):
+        n = out[i]
+        o = row[i]
+        tally[0, n] += 1
+        if n != o:
+            # A cell can only be born (o == 0) or die (n == 0)
+            tally[1, n] += 1
+            tally[2, o] += 1
+            h ^= cell_hash(j * nx + i, n) ^ cell_hash(j * nx + i, o)
+    npy, npx = patch_owners.shape
+    step_y = ny // npy
+    step_x = nx // npx
+    py = j // step_y
+    if py >= npy:
+        return h
+    for px in range(i0 // step_x, min(npx, (i1 - 1) // step_x + 1)):
+        owner = patch_owners[py, px]
+        if owner > 0:
+            inside = 0
+            for i in range(max(i0, px * step_x), min(i1, (px + 1) * step_x)):
+                inside += out[i] == owner
+            tally[3, owner] += inside
+    return h
+
+
+@njit(boundscheck=False, cache=True, fastmath=True)
+def _reduce_tallies(
+    tallies: np.ndarray,
+    hashes: np.ndarray,
+    cell_counts: np.ndarray,
+    cell_stats: np.ndarray,
+    board_hash: np.ndarray,
+):
+    for h in hashes:
+        board_hash[0] ^= h
+    total = tallies.sum(axis=0)
+    cell_counts[...] = total[0, 1:]
+    cell_stats[0] = total[1, 1:]
+    cell_stats[1] = total[2, 1:]
+    cell_stats[2] = total[3, 1:]
+    cell_stats[3] = total[0, 1:] - total[3, 1:]
+
 
 @njit(boundscheck=False, cache=True, fastmath=True, parallel=True)
 def evolve_board(
@@ -11,37 +147,711 @@ def evolve_board(
     xoff: np.ndarray,
     yoff: np.ndarray,
     cell_counts: np.ndarray,
+    cell_stats: np.ndarray,
+    patch_owners: np.ndarray,
+    board_hash: np.ndarray,
     nx: int,
     ny: int,
 ):
-    for j in prange(ny):
+    # Each block of rows accumulates its own per-player tallies while it is
+    # evolved: alive cells, births, deaths and cells inside own patch. The
+    # board hash is updated with the cells that changed.
+    nblocks = min(ny, NBLOCKS)
+    tallies = np.zeros((nblocks, 4, len(cell_counts) + 1), dtype=np.int64)
+    hashes = np.zeros(nblocks, dtype=np.uint64)
+    for b in prange(nblocks):
         neighbors = np.zeros(8, dtype="int32")
         buffer = np.zeros(3, dtype="int32")
-        for i in range(nx):
-            # Get the values of the neighbors
-            neighbor_count = 0
-            for k in range(8):
-                xind = (i + xoff[k]) % nx
-                yind = (j + yoff[k]) % ny
-                n = old[yind, xind]
-                neighbors[k] = n
-                if n > 0:
-                    if neighbor_count < 3:
-                        buffer[neighbor_count] = n
-                    neighbor_count += 1
-
-            # Apply rules
-            if (old[j, i] > 0) and ((neighbor_count == 2) or (neighbor_count == 3)):
-                new[j, i] = old[j, i]
-            elif (old[j, i] == 0) and (neighbor_count == 3):
-                if buffer[0] == buffer[1]:
-                    new[j, i] = buffer[0]
-                elif buffer[0] == buffer[2]:
-                    new[j, i] = buffer[0]
+        for j in range(b * ny // nblocks, (b + 1) * ny // nblocks):
+            for i in range(nx):
+                # Get the values of the neighbors
+                neighbor_count = 0
+                for k in range(8):
+                    xind = (i + xoff[k]) % nx
+                    yind = (j + yoff[k]) % ny
+                    n = old[yind, xind]
+                    neighbors[k] = n
+                    if n > 0:
+                        if neighbor_count < 3:
+                            buffer[neighbor_count] = n
+                        neighbor_count += 1
+
+                # Apply rules
+                if (old[j, i] > 0) and ((neighbor_count == 2) or (neighbor_count == 3)):
+                    new[j, i] = old[j, i]
+                elif (old[j, i] == 0) and (neighbor_count == 3):
+                    if buffer[0] == buffer[1]:
+                        new[j, i] = buffer[0]
+                    elif buffer[0] == buffer[2]:
+                        new[j, i] = buffer[0]
+                    else:
+                        new[j, i] = buffer[1]
                 else:
-                    new[j, i] = buffer[1]
+                    new[j, i] = 0
+            hashes[b] ^= _tally_row(
+                old[j], new[j], 0, nx, j, patch_owners, ny, tallies[b]
+            )
+
+    # Update cell counts and statistics
+    _reduce_tallies(tallies, hashes, cell_counts, cell_stats, board_hash)
+
+
+@njit(boundscheck=False, cache=True, fastmath=True)
+def _birth_value(above, row, below, i, im, ip):
+    # The first three alive neighbours, in the same order as xoff/yoff in
+    # evolve_board, decide who owns the new cell.
+    buffer = (
+        above[im],
+        above[i],
+        above[ip],
+        row[im],
+        row[ip],
+        below[im],
+        below[i],
+        below[ip],
+    )
+    b0 = b1 = b2 = 0
+    found = 0
+    for n in buffer:
+        if n > 0:
+            if found == 0:
+                b0 = n
+            elif found == 1:
+                b1 = n
             else:
-                new[j, i] = 0
+                b2 = n
+                break
+            found += 1
+    if b0 == b1:
+        return b0
+    elif b0 == b2:
+        return b0
+    return b1
+
+
+@njit(boundscheck=False, cache=True, fastmath=True)
+def _evolve_row(
+    above: np.ndarray,
+    row: np.ndarray,
+    below: np.ndarray,
+    out: np.ndarray,
+    i0: int,
+    i1: int,
+    cols: np.ndarray,
+    counts: np.ndarray,
+):
+    # Evolve the cells i0 to i1 of a row, given the rows above and below. The
+    # work buffers cols and counts must hold at least i1 - i0 + 2 values.
+    nx = len(row)
+    n = i1 - i0
+    # Number of alive cells in each column of the 3-row window, padded with
+    # one (periodic) ghost column on each side
+    for k in range(n):
+        i = i0 + k
+        cols[k + 1] = (above[i] > 0) + (row[i] > 0) + (below[i] > 0)
+    left = i0 - 1 if i0 > 0 else nx - 1
+    right = i1 if i1 < nx else 0
+    cols[0] = (above[left] > 0) + (row[left] > 0) + (below[left] > 0)
+    cols[n + 1] = (above[right] > 0) + (row[right] > 0) + (below[right] > 0)
+
+    # Survivors and deaths: a straight sweep over the row
+    for k in range(n):
+        i = i0 + k
+        c = cols[k] + cols[k + 1] + cols[k + 2] - (row[i] > 0)
+        counts[k] = c
+        out[i] = row[i] if (c == 2) or (c == 3) else 0
+
+    # Births are rare, resolve the owner only where needed
+    for k in range(n):
+        i = i0 + k
+        if (counts[k] == 3) and (row[i] == 0):
+            out[i] = _birth_value(
+                above,
+                row,
+                below,
+                i,
+                i - 1 if i > 0 else nx - 1,
+                i + 1 if i < nx - 1 else 0,
+            )
+
+
+@njit(boundscheck=False, cache=True, fastmath=True, parallel=True)
+def evolve_board_stencil(
+    old: np.ndarray,
+    new: np.ndarray,
+    xoff: np.ndarray,
+    yoff: np.ndarray,
+    cell_counts: np.ndarray,
+    cell_stats: np.ndarray,
+    patch_owners: np.ndarray,
+    board_hash: np.ndarray,
+    nx: int,
+    ny: int,
+):
+    """
+    Same as evolve_board, but without a modulo for every neighbour. The
+    periodic boundaries are handled by picking the rows above and below once
+    per row, and by padding the column sums with one ghost cell on each side.
+    ``xoff`` and ``yoff`` are unused; they are kept so that the two kernels can
+    be swapped in the Engine.
+    """
+    nblocks = min(ny, NBLOCKS)
+    tallies = np.zeros((nblocks, 4, len(cell_counts) + 1), dtype=np.int64)
+    hashes = np.zeros(nblocks, dtype=np.uint64)
+    for b in prange(nblocks):
+        cols = np.empty(nx + 2, dtype=np.uint8)
+        counts = np.empty(nx, dtype=np.uint8)
+        for j in range(b * ny // nblocks, (b + 1) * ny // nblocks):
+            _evolve_row(
+                old[j - 1 if j > 0 else ny - 1],
+                old[j],
+                old[j + 1 if j < ny - 1 else 0],
+                new[j],
+                0,
+                nx,
+                cols,
+                counts,
+            )
+            hashes[b] ^= _tally_row(
+                old[j], new[j], 0, nx, j, patch_owners, ny, tallies[b]
+            )
+
+    # Update cell counts and statistics
+    _reduce_tallies(tallies, hashes, cell_counts, cell_stats, board_hash)
+
+
+@njit(boundscheck=False, cache=True, fastmath=True, parallel=True)
+def evolve_strip(
+    old: np.ndarray,
+    new: np.ndarray,
+    j0: int,
+    j1: int,
+    patch_owners: np.ndarray,
+    tally: np.ndarray,
+) -> np.uint64:
+    """
+    Evolve the rows ``j0`` to ``j1`` (excluded) of the board, in the same way as
+    evolve_board_stencil. The rows just outside the strip (its halo) are read
+    from ``old``, where they belong to the neighbouring strips. ``tally``
+    receives the alive cells, births, deaths and cells inside own patch of each
+    player in the strip (with shape (4, players + 1), column 0 is scratch
+    space), and the change in the board hash is returned.
+    """
+    ny, nx = old.shape
+    nrows = j1 - j0
+    nblocks = min(nrows, NBLOCKS)
+    tallies = np.zeros((nblocks,) + tally.shape, dtype=np.int64)
+    hashes = np.zeros(nblocks, dtype=np.uint64)
+    for b in prange(nblocks):
+        cols = np.empty(nx + 2, dtype=np.uint8)
+        counts = np.empty(nx, dtype=np.uint8)
+        for j in range(j0 + b * nrows // nblocks, j0 + (b + 1) * nrows // nblocks):
+            _evolve_row(
+                old[j - 1 if j > 0 else ny - 1],
+                old[j],
+                old[j + 1 if j < ny - 1 else 0],
+                new[j],
+                0,
+                nx,
+                cols,
+                counts,
+            )
+            hashes[b] ^= _tally_row(
+                old[j], new[j], 0, nx, j, patch_owners, ny, tallies[b]
+            )
+    tally[...] = tallies.sum(axis=0)
+    h = np.uint64(0)
+    for hb in hashes:
+        h ^= hb
+    return h
+
+
+@njit(boundscheck=False, cache=True, fastmath=True, parallel=True)
+def evolve_board_tiles(
+    old: np.ndarray,
+    new: np.ndarray,
+    active: np.ndarray,
+    changed: np.ndarray,
+    cell_counts: np.ndarray,
+    cell_stats: np.ndarray,
+    patch_owners: np.ndarray,
+    board_hash: np.ndarray,
+    tile_size: int,
+    nx: int,
+    ny: int,
+):
+    """
+    Evolve only the tiles of the board that are flagged in ``active``. The
+    other tiles are assumed to be identical in ``old`` and ``new``. On return,
+    ``changed`` flags the tiles where at least one cell changed. ``cell_counts``,
+    the cells inside/outside own patch in ``cell_stats`` and ``board_hash`` are
+    updated with the cells that were born or died, while births and deaths are
+    replaced.
+    """
+    ntx = active.shape[1]
+    changed[...] = False
+    tiles = np.nonzero(active.ravel())[0]
+    # Per-tile changes in alive cells, births, deaths, and cells in own patch
+    deltas = np.zeros((len(tiles), 4, len(cell_counts) + 1), dtype=np.int64)
+    hashes = np.zeros(len(tiles), dtype=np.uint64)
+    for t in prange(len(tiles)):
+        ty, tx = divmod(tiles[t], ntx)
+        i0 = tx * tile_size
+        i1 = min(nx, i0 + tile_size)
+        cols = np.empty(tile_size + 2, dtype=np.uint8)
+        counts = np.empty(tile_size, dtype=np.uint8)
+        tile_changed = False
+        for j in range(ty * tile_size, min(ny, (ty + 1) * tile_size)):
+            row = old[j]
+            out = new[j]
+            _evolve_row(
+                old[j - 1 if j > 0 else ny - 1],
+                row,
+                old[j + 1 if j < ny - 1 else 0],
+                out,
+                i0,
+                i1,
+                cols,
+                counts,
+            )
+            for i in range(i0, i1):
+                n = out[i]
+                o = row[i]
+                if n != o:
+                    deltas[t, 0, o] -= 1
+                    deltas[t, 0, n] += 1
+                    deltas[t, 1, n] += 1
+                    deltas[t, 2, o] += 1
+                    hashes[t] ^= cell_hash(j * nx + i, n) ^ cell_hash(j * nx + i, o)
+                    owner = _patch_owner(patch_owners, j, i, nx, ny)
+                    if owner == n:
+                        deltas[t, 3, n] += 1
+                    elif owner == o:
+                        deltas[t, 3, o] -= 1
+                    tile_changed = True
+        changed[ty, tx] = tile_changed
+
+    # Update cell counts and statistics
+    for h in hashes:
+        board_hash[0] ^= h
+    total = deltas.sum(axis=0)
+    cell_counts += total[0, 1:]
+    cell_stats[0] = total[1, 1:]
+    cell_stats[1] = total[2, 1:]
+    cell_stats[2] += total[3, 1:]
+    cell_stats[3] = cell_counts - cell_stats[2]
+
+
+@njit(boundscheck=False, cache=True, fastmath=True, parallel=True)
+def copy_tiles(
+    src: np.ndarray,
+    dst: np.ndarray,
+    tiles: np.ndarray,
+    tile_size: int,
+    nx: int,
+    ny: int,
+):
+    """
+    Copy the tiles of the board that are flagged in ``tiles`` from ``src`` to
+    ``dst``.
+    """
+    ntx = tiles.shape[1]
+    flagged = np.nonzero(tiles.ravel())[0]
+    for t in prange(len(flagged)):
+        ty, tx = divmod(flagged[t], ntx)
+        i0 = tx * tile_size
+        i1 = min(nx, i0 + tile_size)
+        for j in range(ty * tile_size, min(ny, (ty + 1) * tile_size)):
+            dst[j, i0:i1] = src[j, i0:i1]
+
+
+@njit(boundscheck=False, cache=True, fastmath=True, parallel=True)
+def pack_board(board: np.ndarray, packed: np.ndarray):
+    """
+    Pack the occupancy of a board into 64-bit words: bit ``k`` of word ``w`` of
+    a row is column ``64 * w + k``. The cells are read 8 (uint8 boards) or 4
+    (uint16 boards) at a time, as one 64-bit lane, and the non-zero cells of a
+    lane are turned into bits with a few bitwise operations and a multiply that
+    gathers the bits (little-endian). ``nx`` must be a multiple of 64.
+    """
+    ny, nx = board.shape
+    nwords = nx // 64
+    for j in prange(ny):
+        lanes = board[j].view(np.uint64)
+        if board.itemsize == 1:
+            for w in range(nwords):
+                bits = np.uint64(0)
+                for q in range(8):
+                    x = lanes[w * 8 + q]
+                    # High bit of every non-zero byte, gathered in the top byte
+                    t = (x | ((x & LOW_7) + LOW_7)) & HIGH_8
+                    t = ((t >> np.uint64(7)) * GATHER_8) >> np.uint64(56)
+                    bits |= t << np.uint64(8 * q)
+                packed[j, w] = bits
+        else:
+            for w in range(nwords):
+                bits = np.uint64(0)
+                for q in range(16):
+                    x = lanes[w * 16 + q]
+                    t = (x | ((x & LOW_15) + LOW_15)) & HIGH_16
+                    t = ((t >> np.uint64(15)) * GATHER_16) >> np.uint64(60)
+                    bits |= t << np.uint64(4 * q)
+                packed[j, w] = bits
+
+
+@njit(boundscheck=False, cache=True, fastmath=True)
+def _full_adder(a, b, c):
+    axb = a ^ b
+    return axb ^ c, (a & b) | (c & axb)
+
+
+@njit(boundscheck=False, cache=True, fastmath=True)
+def _lane_mask(bits, itemsize: int):
+    # Mask of a 64-bit lane of 8 (uint8) or 4 (uint16) cells, with all the bits
+    # of cell k set if bit k of ``bits`` is set (the reverse of pack_board)
+    if itemsize == 1:
+        x = (bits * REPEAT_8) & SPREAD_8
+        t = (x | ((x & LOW_7) + LOW_7)) & HIGH_8
+        return (t >> np.uint64(7)) * np.uint64(0xFF)
+    x = (bits * REPEAT_16) & SPREAD_16
+    t = (x | ((x & LOW_15) + LOW_15)) & HIGH_16
+    return (t >> np.uint64(15)) * np.uint64(0xFFFF)
+
+
+@njit(boundscheck=False, cache=True, fastmath=True, parallel=True)
+def evolve_board_bitpacked(
+    old: np.ndarray,
+    new: np.ndarray,
+    packed_old: np.ndarray,
+    packed_new: np.ndarray,
+    cell_counts: np.ndarray,
+    cell_stats: np.ndarray,
+    patch_owners: np.ndarray,
+    board_hash: np.ndarray,
+    nx: int,
+    ny: int,
+):
+    """
+    Same as evolve_board, on the occupancy of the board packed in 64-bit words
+    (see pack_board), which is kept from one step to the next: ``packed_old``
+    holds the occupancy of ``old``, and ``packed_new`` receives that of ``new``.
+    The neighbour counts are computed with bitwise adders, 64 cells at a time,
+    and the owners of the survivors are copied 8 (uint8) or 4 (uint16) cells at
+    a time through a mask. Only the cells that are born or die are visited one
+    by one: as in evolve_board_tiles, ``cell_counts``, the cells inside/outside
+    own patch in ``cell_stats`` and ``board_hash`` are updated with them, while
+    births and deaths are replaced. ``nx`` must be a multiple of 64.
+    """
+    one = np.uint64(1)
+    sixty_three = np.uint64(63)
+    byte = np.uint64(0xFF)
+    nwords = nx // 64
+    itemsize = old.itemsize
+    cells = 8 // itemsize
+    lanes = 64 // cells
+    group = np.uint64((1 << cells) - 1)
+    npy, npx = patch_owners.shape
+    step_y = ny // npy
+    step_x = nx // npx
+
+    nblocks = min(ny, NBLOCKS)
+    # Per-block changes in alive cells, births, deaths, and cells in own patch
+    deltas = np.zeros((nblocks, 4, len(cell_counts) + 1), dtype=np.int64)
+    hashes = np.zeros(nblocks, dtype=np.uint64)
+    for b in prange(nblocks):
+        delta = deltas[b]
+        for j in range(b * ny // nblocks, (b + 1) * ny // nblocks):
+            above = packed_old[j - 1 if j > 0 else ny - 1]
+            middle = packed_old[j]
+            below = packed_old[j + 1 if j < ny - 1 else 0]
+            row = old[j]
+            out = new[j]
+            row_lanes = row.view(np.uint64)
+            out_lanes = out.view(np.uint64)
+            words = packed_new[j]
+            py = j // step_y
+            for w in range(nwords):
+                wl = w - 1 if w > 0 else nwords - 1
+                wr = w + 1 if w < nwords - 1 else 0
+                # Bit k of a word is column w * 64 + k. Shift the neighbouring
+                # columns into place, carrying the bits across word boundaries.
+                a, m, c = above[w], middle[w], below[w]
+                a_west = (a << one) | (above[wl] >> sixty_three)
+                a_east = (a >> one) | (above[wr] << sixty_three)
+                m_west = (m << one) | (middle[wl] >> sixty_three)
+                m_east = (m >> one) | (middle[wr] << sixty_three)
+                c_west = (c << one) | (below[wl] >> sixty_three)
+                c_east = (c >> one) | (below[wr] << sixty_three)
+
+                # Add up the 8 neighbours into the bits s0..s3 of the count
+                sum_a, carry_a = _full_adder(a_west, a, a_east)
+                sum_b, carry_b = _full_adder(m_west, m_east, c_west)
+                sum_c, carry_c = c ^ c_east, c & c_east
+                s0, carry_1 = _full_adder(sum_a, sum_b, sum_c)
+                sum_2, carry_2 = _full_adder(carry_a, carry_b, carry_c)
+                s1 = sum_2 ^ carry_1
+                carry_4 = sum_2 & carry_1
+                s2 = carry_2 ^ carry_4
+                s3 = carry_2 & carry_4
+
+                two_or_three = s1 & ~s2 & ~s3
+                survivors = two_or_three & m
+                births = two_or_three & s0 & ~m
+                words[w] = survivors | births
+
+                # The survivors keep their owner, the other cells are cleared
+                l0 = w * lanes
+                if survivors == 0:
+                    out_lanes[l0 : l0 + lanes] = 0
+                else:
+                    for q in range(lanes):
+                        bits = (survivors >> np.uint64(q * cells)) & group
+                        mask = _lane_mask(bits, itemsize)
+                        out_lanes[l0 + q] = row_lanes[l0 + q] & mask
+
+                # Births and deaths, skipping the bytes where nothing changed
+                changed = m ^ words[w]
+                if changed == 0:
+                    continue
+                i0 = w * 64
+                # Owner of the patch the word is in (-1 if it spans two patches)
+                owner = 0
+                px = i0 // step_x
+                if (py < npy) and (px < npx):
+                    owner = patch_owners[py, px]
+                if (i0 + 63) // step_x != px:
+                    owner = -1
+                for q in range(8):
+                    if ((changed >> np.uint64(8 * q)) & byte) == 0:
+                        continue
+                    for k in range(8 * q, 8 * q + 8):
+                        if ((changed >> np.uint64(k)) & one) == 0:
+                            continue
+                        i = i0 + k
+                        o = row[i]
+                        n = 0
+                        if (births >> np.uint64(k)) & one:
+                            n = _birth_value(
+                                old[j - 1 if j > 0 else ny - 1],
+                                row,
+                                old[j + 1 if j < ny - 1 else 0],
+                                i,
+                                i - 1 if i > 0 else nx - 1,
+                                i + 1 if i < nx - 1 else 0,
+                            )
+                            out[i] = n
+                        delta[0, o] -= 1
+                        delta[0, n] += 1
+                        delta[1, n] += 1
+                        delta[2, o] += 1
+                        hashes[b] ^= cell_hash(j * nx + i, n) ^ cell_hash(j * nx + i, o)
+                        patch = owner
+                        if patch < 0:
+                            patch = _patch_owner(patch_owners, j, i, nx, ny)
+                        if patch == n:
+                            delta[3, n] += 1
+                        elif patch == o:
+                            delta[3, o] -= 1
+
+    # Update cell counts and statistics
+    for h in hashes:
+        board_hash[0] ^= h
+    total = deltas.sum(axis=0)
+    cell_counts += total[0, 1:]
+    cell_stats[0] = total[1, 1:]
+    cell_stats[1] = total[2, 1:]
+    cell_stats[2] += total[3, 1:]
+    cell_stats[3] = cell_counts - cell_stats[2]
+
+
+@njit(boundscheck=False, cache=True, fastmath=True, parallel=True)
+def evolve_candidates(
+    window: np.ndarray,
+    xs: np.ndarray,
+    ys: np.ndarray,
+    starts: np.ndarray,
+    player: int,
+    steps: int,
+    counts: np.ndarray,
+):
+    """
+    Evolve a copy of ``window`` by ``steps`` iterations for each candidate
+    placement, with the same rules as evolve_board but with no alive cells
+    outside the window. Candidate ``c`` places the cells
+    ``xs[starts[c]:starts[c + 1]]``, ``ys[starts[c]:starts[c + 1]]`` (window
+    coordinates) for ``player``, unless one of them is on an alive cell. The
+    candidates are spread over the threads, and ``counts`` (candidates,
+    players) receives the number of alive cells of each player at the end.
+    """
+    ny, nx = window.shape
+    for c in prange(len(starts) - 1):
+        # One row and column of empty cells all around the window
+        old = np.zeros((ny + 2, nx + 2), dtype=window.dtype)
+        new = np.zeros_like(old)
+        old[1:-1, 1:-1] = window
+        free = True
+        for k in range(starts[c], starts[c + 1]):
+            free &= window[ys[k], xs[k]] == 0
+        if free:
+            for k in range(starts[c], starts[c + 1]):
+                old[ys[k] + 1, xs[k] + 1] = player
+        cols = np.empty(nx + 2, dtype=np.uint8)
+        work = np.empty(nx, dtype=np.uint8)
+        for _ in range(steps):
+            for j in range(1, ny + 1):
+                _evolve_row(
+                    old[j - 1], old[j], old[j + 1], new[j], 1, nx + 1, cols, work
+                )
+            old, new = new, old
+        tally = np.zeros(counts.shape[1] + 1, dtype=np.int64)
+        for j in range(1, ny + 1):
+            for i in range(1, nx + 1):
+                tally[old[j, i]] += 1
+        counts[c] = tally[1:]
+
+
+@njit(boundscheck=False, cache=True, fastmath=True)
+def evolve_steps(
+    kernel: str,
+    old: np.ndarray,
+    new: np.ndarray,
+    xoff: np.ndarray,
+    yoff: np.ndarray,
+    packed_old: np.ndarray,
+    packed_new: np.ndarray,
+    cell_counts: np.ndarray,
+    cell_stats: np.ndarray,
+    patch_owners: np.ndarray,
+    board_hash: np.ndarray,
+    nx: int,
+    ny: int,
+    player_histories: np.ndarray,
+    player_stats: np.ndarray,
+    hash_history: np.ndarray,
+    player_tokens: np.ndarray,
+    token_interval: int,
+    start: int,
+    stop: int,
+) -> bool:
+    """
+    Run the iterations from ``start`` to ``stop`` (excluded) with the kernel of
+    the given name, without going back to Python, while no bot needs to be
+    called.
+    Tokens are given to the players that are alive and the histories are
+    recorded for every step. ``packed_old`` and ``packed_new`` are only used by
+    the bitpacked kernel. Returns True if the current board ends up in ``new``
+    (odd number of steps).
+    """
+    for it in range(start, stop):
+        if it % token_interval == 0:
+            for i in range(len(player_tokens)):
+                if cell_counts[i] > 0:
+                    player_tokens[i] += 1
+        # Kernels are selected by name: passing the function itself would
+        # prevent caching the compiled loop.
+        if kernel == "stencil":
+            evolve_board_stencil(
+                old,
+                new,
+                xoff,
+                yoff,
+                cell_counts,
+                cell_stats,
+                patch_owners,
+                board_hash,
+                nx,
+                ny,
+            )
+        elif kernel == "bitpacked":
+            evolve_board_bitpacked(
+                old,
+                new,
+                packed_old,
+                packed_new,
+                cell_counts,
+                cell_stats,
+                patch_owners,
+                board_hash,
+                nx,
+                ny,
+            )
+        else:
+            evolve_board(
+                old,
+                new,
+                xoff,
+                yoff,
+                cell_counts,
+                cell_stats,
+                patch_owners,
+                board_hash,
+                nx,
+                ny,
+            )
+        old, new = new, old
+        packed_old, packed_new = packed_new, packed_old
+        player_histories[:, it] = cell_counts
+        player_stats[:, :, it] = cell_stats
+        hash_history[it] = board_hash[0]
+    return (stop - start) % 2 == 1
+
+
+kernels = {
+    "modulo": evolve_board,
+    "stencil": evolve_board_stencil,
+    "bitpacked": evolve_board_bitpacked,
+}
+
+# Board dtypes the kernels are compiled for (see tools.board_dtype)
+BOARD_DTYPES = (np.uint8, np.uint16)
+
+
+def signatures(dtype) -> dict:
+    """
+    Explicit signatures of the kernels, for boards of the given dtype and the
+    arrays the Engine (and the strip workers) call them with.
+    """
+    b = f"{np.dtype(dtype).name}[:, ::1]"
+    counts = "int64[::1], int64[:, ::1], int64[:, ::1], uint64[::1]"
+    step = f"void({b}, {b}, int64[::1], int64[::1], {counts}, int64, int64)"
+    packed = "uint64[:, ::1], uint64[:, ::1]"
+    return {
+        "modulo": (evolve_board, step),
+        "stencil": (evolve_board_stencil, step),
+        "bitpacked": (
+            evolve_board_bitpacked,
+            f"void({b}, {b}, {packed}, {counts}, int64, int64)",
+        ),
+        "pack": (pack_board, f"void({b}, uint64[:, ::1])"),
+        "tiles": (
+            evolve_board_tiles,
+            f"void({b}, {b}, boolean[:, ::1], boolean[:, ::1], {counts}, int64, "
+            "int64, int64)",
+        ),
+        "copy_tiles": (
+            copy_tiles,
+            f"void({b}, {b}, boolean[:, ::1], int64, int64, int64)",
+        ),
+        "steps": (
+            evolve_steps,
+            f"boolean(unicode_type, {b}, {b}, int64[::1], int64[::1], {packed}, "
+            f"{counts}, int64, int64, int64[:, ::1], int64[:, :, ::1], "
+            "uint64[::1], int64[::1], int64, int64, int64)",
+        ),
+        "strip": (
+            evolve_strip,
+            f"uint64({b}, {b}, int64, int64, int64[:, ::1], int64[:, ::1])",
+        ),
+    }
+
 
-    # Update cell counts
-    cell_counts[...] = np.bincount(new.ravel())[1:]
+def load_kernels(dtype, names: Sequence[str]):
+    """
+    Load the kernels with the given names (keys of ``signatures``) for boards of
+    the given dtype from the numba cache, or compile them if they are not
+    cached yet, ahead of their first call.
+    """
+    table = signatures(dtype)
+    for name in names:
+        function, signature = table[name]
+        function.compile(signature)
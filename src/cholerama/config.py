@@ -6,16 +6,35 @@ from typing import Tuple
 
 @dataclass(frozen=True)
 class Config:
+    """
+    Size of the board and of the grid of starting patches, and token budget of
+    a game. The default one is used when no config is given to ``setup`` and
+    the ``Engine`` (and to ``headless``/``play``).
+
+    Each player starts in its own patch, so a game can have up to
+    ``npatches[0] * npatches[1]`` players. For instance, 256 players on patches
+    of 256x256 cells need ``Config(nx=4096, ny=4096, npatches=(16, 16))``.
+    """
+
     nx: int = 1024
     ny: int = 1024
-    npatches: Tuple[int] = (4, 4)
+    npatches: Tuple[int, int] = (4, 4)
     max_name_length: int = 30
     initial_tokens: int = 100
     additional_tokens: int = 200
 
     def __post_init__(self):
+        if (self.ny % self.npatches[0] != 0) or (self.nx % self.npatches[1] != 0):
+            raise ValueError(
+                f"The board ({self.ny}, {self.nx}) cannot be split into "
+                f"{self.npatches} patches."
+            )
         object.__setattr__(self, "stepx", self.nx // self.npatches[1])
         object.__setattr__(self, "stepy", self.ny // self.npatches[0])
 
+    @property
+    def max_players(self) -> int:
+        return self.npatches[0] * self.npatches[1]
+
 
 config = Config()
@@ -1,31 +1,76 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
+import os
 import time
-from typing import Optional
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.synchronize import Event
+from typing import Optional, Sequence, Tuple
 
+import numba
 import numpy as np
 
-from . import config
-from .compute import evolve_board
-from .helpers import Positions
+from .analysis import BoardAnalysis, wants_analysis
+from .config import Config
+from .config import config as default_config
+from .compute import (
+    STATS,
+    _reduce_tallies,
+    copy_tiles,
+    evolve_board_tiles,
+    evolve_steps,
+    hash_board,
+    hash_cells,
+    kernels,
+    load_kernels,
+    pack_board,
+)
+from .helpers import Positions, Sleep
 from .player import Player
-from .plot import plot
+from .recording import Recorder
+from .results import SINKS, save_results
+from .sync import FrameExchange
 from .scores import finalize_scores
-from .tools import array_from_shared_mem, make_color, make_starting_positions
+from .tools import (
+    array_from_shared_mem,
+    board_dtype,
+    make_color,
+    make_starting_positions,
+)
+from .workers import BotWorker, StripWorker
 
+# Longest stretch of idle iterations run in one go when looking for a cycle (see
+# Engine.idle_until)
+CYCLE_CHECK_INTERVAL = 256
 
-def setup(bots, iterations, seed=None):
+
+def setup(bots, iterations, seed=None, buffers=None, config=None):
+    if config is None:
+        config = default_config
     rng = np.random.default_rng(seed)
     nplayers = len(bots)
 
-    board_old = np.zeros((config.ny, config.nx), dtype=int)
-    board_new = board_old.copy()
-    player_histories = np.zeros((nplayers, iterations + 1), dtype=int)
-    player_tokens = np.zeros(nplayers, dtype=int)
-    game_flow = np.zeros(2, dtype=bool)  # pause, exit
+    if buffers is None:
+        board_old = np.zeros((config.ny, config.nx), dtype=board_dtype(nplayers))
+        board_new = board_old.copy()
+        player_histories = np.zeros((nplayers, iterations + 1), dtype=int)
+        player_stats = np.zeros((len(STATS), nplayers, iterations + 1), dtype=int)
+        player_tokens = np.zeros(nplayers, dtype=int)
+        board_index = np.zeros(1, dtype=int)  # 0: board_old is live, 1: board_new
+        game_flow = np.zeros(2, dtype=bool)  # pause, exit
+    else:
+        # Start a new game in the buffers of a previous one, without allocating
+        for buffer in buffers.values():
+            buffer[...] = 0
+        board_old = buffers["board_old"]
+        board_new = buffers["board_new"]
+        player_histories = buffers["player_histories"]
+        player_stats = buffers["player_stats"]
+        player_tokens = buffers["player_tokens"]
+        board_index = buffers["board_index"]
+        game_flow = buffers["game_flow"]
 
-    starting_patches = make_starting_positions(nplayers, rng)
-    patch_size = (config.ny // config.npatches[0], config.nx // config.npatches[1])
+    starting_patches = make_starting_positions(nplayers, rng, config=config)
+    patch_size = (config.stepy, config.stepx)
 
     if isinstance(bots, dict):
         dict_of_bots = {
@@ -55,6 +100,7 @@ def setup(bots, iterations, seed=None):
             pattern=bot.pattern,
             color=make_color(i if bot.color is None else bot.color),
             patch=patch,
+            config=config,
         )
         p = player.pattern
         x, y = p.x, p.y
@@ -63,13 +109,16 @@ def setup(bots, iterations, seed=None):
         board_old[y, x] = player.number
         players[bot.name] = player
         player_histories[i, 0] = player.ncells
+        player_stats[STATS.index("inside"), i, 0] = player.ncells
         player_tokens[i] = player.tokens
 
     buffers = {
         "board_old": board_old,
         "board_new": board_new,
         "player_histories": player_histories,
+        "player_stats": player_stats,
         "player_tokens": player_tokens,
+        "board_index": board_index,
         "game_flow": game_flow,
     }
     return buffers, players, dict_of_bots
@@ -84,46 +133,398 @@ class Engine:
         buffers: dict,
         safe: bool = False,
         test: bool = True,
+        swap_buffers: bool = False,
+        kernel: str = "modulo",
+        tile_size: Optional[int] = None,
+        detect_cycles: bool = False,
+        bot_processes: bool = False,
+        shared_boards: Optional[Sequence] = None,
+        strips: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        round_time_limit: Optional[float] = None,
+        verbose: bool = True,
+        record: Optional[str] = None,
+        analysis: bool = False,
+        config: Optional[Config] = None,
+        results: Optional[str] = "npz",
+        pdf: bool = False,
     ):
+        # The size of the board and patches, and the token budget of the game
+        # (the same as given to setup)
+        self.config = default_config if config is None else config
+        if buffers["board_old"].shape != (self.config.ny, self.config.nx):
+            raise ValueError(
+                f"The board has shape {buffers['board_old'].shape}, but the config is "
+                f"for ({self.config.ny}, {self.config.nx}): use the same config in "
+                "setup."
+            )
+        # Hand a BoardAnalysis of the board to the bots that accept an analysis
+        # argument. It is shared by all the bots in an iteration.
+        self.analysis = analysis
+        self.cell_counts = np.zeros(len(bots), dtype=int)
+        self.cell_stats = np.zeros((len(STATS), len(bots)), dtype=int)
+        self.board_hash = np.zeros(1, dtype=np.uint64)
+        self.patch_owners = np.zeros(self.config.npatches, dtype=int)
+        self.use_buffers(bots=bots, players=players, buffers=buffers)
+
+        self.iterations = iterations
+        self.verbose = verbose
+        self._test = test
+        self.safe = safe
+        # Swap the roles of the two boards after each step instead of copying
+        # board_new into board_old. The live board is then always board_old,
+        # while board_index tells other processes which buffer that is.
+        self.swap_buffers = swap_buffers
+        self.token_interval = max(1, iterations // self.config.additional_tokens)
+        if kernel not in kernels:
+            raise ValueError(
+                f"Unknown kernel {kernel}, must be one of {list(kernels.keys())}."
+            )
+        if (kernel == "bitpacked") and (self.config.nx % 64 != 0):
+            raise ValueError(
+                "The bitpacked kernel requires nx to be a multiple of 64, "
+                f"got {self.config.nx}."
+            )
+        self.kernel = kernel
+        self.evolve_board = kernels[kernel]
+        # Where the results are written at the end of the game (see
+        # results.ResultWriter), and whether they are also drawn in a PDF
+        if results not in SINKS:
+            raise ValueError(f"Unknown results sink {results}, must be one of {SINKS}.")
+        self.results = results
+        self.pdf = pdf
+
+        self.xoff = np.array([-1, 0, 1, -1, 1, -1, 0, 1])
+        self.yoff = np.array([-1, -1, -1, 0, 0, 1, 1, 1])
+
+        # Active-tile mode: only the tiles that changed in the previous step (or
+        # received new cells), and their neighbours, are evolved. Without
+        # swap_buffers, only the tiles that changed are then copied back to
+        # board_old.
+        self.tile_size = tile_size
+        if self.tile_size is not None:
+            ntiles = (-(-self.config.ny // tile_size), -(-self.config.nx // tile_size))
+            self.active_tiles = np.ones(ntiles, dtype=bool)
+            self.dirty_tiles = np.ones(ntiles, dtype=bool)
+
+        # Time budgets of the bots, in seconds: a bot that takes longer than
+        # time_limit in an iteration forfeits the cells it placed, and a bot that
+        # has used up round_time_limit is no longer called. The wall and CPU time
+        # of each call are recorded (NaN if the bot was not called), and the wall
+        # times are summed up as they come in.
+        self.time_limit = time_limit
+        self.round_time_limit = round_time_limit
+        self.bot_times = np.empty((2, len(self.bots), iterations + 1))
+        self.round_times = np.empty(len(self.bots))
+        self.overruns = np.empty(len(self.bots), dtype=int)
+
+        # Run each bot in its own process, all at the same time. The bots read
+        # the boards from shared memory: the (shared_mem, dtype, shape) of the
+        # two boards can be given if they already live there. The processes are
+        # not forked from the engine (see workers._context).
+        self.workers = None
+        self._shared_memory = []
+        self._shared_boards = shared_boards
+        if bot_processes:
+            self.start_bot_workers()
+
+        # Split the board into horizontal strips, each evolved by its own process
+        # (with the same rules as the stencil kernel, and also not forked from
+        # the engine). The strips read their halo rows from the shared boards,
+        # and their tallies are reduced here.
+        self.strips = None
+        if strips is not None:
+            if self.tile_size is not None:
+                raise ValueError("Strips cannot be combined with tile_size.")
+            self.start_strip_workers(strips)
+
+        # The bitpacked kernel keeps the occupancy of the two boards packed in
+        # 64-bit words from one step to the next (empty for the other kernels)
+        packed = (kernel == "bitpacked") and (self.tile_size is None)
+        packed = packed and (self.strips is None)
+        shape = (self.config.ny, self.config.nx // 64) if packed else (0, 0)
+        self.packed_old = np.zeros(shape, dtype=np.uint64)
+        self.packed_new = np.zeros(shape, dtype=np.uint64)
+
+        # Load the compiled kernels before the first iteration
+        self.warm_up()
+
+        self.hash_history = np.zeros(iterations + 1, dtype=np.uint64)
+        # Iteration at which each bot wants to be called again (see helpers.Sleep)
+        self.wake_up = np.zeros(len(self.bots), dtype=int)
+        # Cycle detection: once none of the bots that are alive can be called
+        # again (see bots_done) and the board repeats itself, the rest of the
+        # round is filled in from the cycle.
+        self.detect_cycles = detect_cycles
+        self.reset()
+
+        # Record every iteration of the game to a file (see recording.Recorder).
+        # The iterations are then all stepped one by one.
+        self.recorder = None
+        if record is not None:
+            self.recorder = Recorder(
+                record, self.board_old, self.cell_counts, self.players
+            )
+
+    def use_buffers(self, bots: dict, players: dict, buffers: dict):
+        """
+        Play with the given bots and players, on the boards and histories in
+        ``buffers`` (as returned by ``setup``).
+        """
         self.bots = bots
         self.players = players
         self.board_old = buffers["board_old"]
         self.board_new = buffers["board_new"]
+        self.board_index = buffers["board_index"]
         self.player_histories = buffers["player_histories"]
+        self.player_stats = buffers["player_stats"]
         self.player_tokens = buffers["player_tokens"]
         self.game_flow = buffers["game_flow"]
-        self.cell_counts = np.zeros(len(self.bots), dtype=int)
+        # Player number owning each starting patch, 0 if the patch is free
+        self.patch_owners[...] = 0
+        for player in self.players.values():
+            self.patch_owners[player.patch] = player.number
+        self.patches = {p.number: p.patch_bounds for p in self.players.values()}
+        self.analysed = {
+            name: self.analysis and wants_analysis(bot) for name, bot in bots.items()
+        }
 
-        self.iterations = iterations
-        self._test = test
-        self.safe = safe
-        self.token_interval = max(1, iterations // config.additional_tokens)
+    def reset(self):
+        """
+        Reset the state of the round to the start, from the current board_old.
+        """
+        # Cell counts are updated incrementally by the tile and bitpacked kernels,
+        # starting from these
+        self.cell_counts[...] = np.bincount(
+            self.board_old.ravel(), minlength=len(self.cell_counts) + 1
+        )[1:]
+        self.cell_stats[...] = 0
+        inside = STATS.index("inside")
+        for i, player in enumerate(self.players.values()):
+            b = player.patch_bounds
+            self.cell_stats[inside, i] = np.count_nonzero(
+                self.board_old[b["ymin"] : b["ymax"], b["xmin"] : b["xmax"]]
+                == player.number
+            )
+        self.cell_stats[STATS.index("outside")] = (
+            self.cell_counts - self.cell_stats[inside]
+        )
+        # Until the first step, the bots are handed board_new (unless the buffers
+        # are swapped)
+        self.board_new[...] = self.board_old
+        if self.packed_old.size:
+            pack_board(self.board_old, self.packed_old)
+            self.packed_new[...] = self.packed_old
+        if self.tile_size is not None:
+            self.dirty_tiles[...] = True
+        # The kernels then keep the hash up to date with the cells that change
+        self.board_hash[0] = hash_board(self.board_old)
+        self.hash_history[0] = self.board_hash[0]
+        self.bot_times[...] = np.nan
+        self.round_times[...] = 0.0
+        self.overruns[...] = 0
+        self.wake_up[...] = 0
+        self._hashes = {}
+        self._cycle = None
+        self._checked = -1
+        self._placed = False
 
-        self.xoff = np.array([-1, 0, 1, -1, 1, -1, 0, 1])
-        self.yoff = np.array([-1, -1, -1, 0, 0, 1, 1, 1])
+    def warm_up(self):
+        """
+        Load the kernels used in the game for the dtype of the board, from the
+        numba cache (see compute.load_kernels), and run the kernel once on a tiny
+        scratch board to start the numba threads. The boards and counts of the
+        game are left untouched. The strip workers warm themselves up.
+        """
+        if self.strips is not None:
+            return
+        names = ["tiles"] if self.tile_size is not None else [self.kernel, "steps"]
+        if (self.tile_size is not None) and not self.swap_buffers:
+            names.append("copy_tiles")
+        if self.packed_old.size:
+            names.append("pack")
+        load_kernels(self.board_old.dtype, names)
+        old = np.zeros((4, 64), dtype=self.board_old.dtype)
+        new = np.empty_like(old)
+        args = (
+            np.zeros_like(self.cell_counts),
+            np.zeros_like(self.cell_stats),
+            np.zeros((1, 1), dtype=int),
+            np.zeros(1, dtype=np.uint64),
+        )
+        if self.tile_size is not None:
+            tiles = np.ones((1, 1), dtype=bool)
+            evolve_board_tiles(old, new, tiles, tiles.copy(), *args, 64, 64, 4)
+        elif self.packed_old.size:
+            packed = np.zeros((4, 1), dtype=np.uint64)
+            self.evolve_board(old, new, packed, packed.copy(), *args, 64, 4)
+        else:
+            self.evolve_board(old, new, self.xoff, self.yoff, *args, 64, 4)
 
-        # Pre-compile numba function
-        evolve_board(
-            self.board_old,
-            self.board_new,
-            self.xoff,
-            self.yoff,
+    def log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def share(self, array: np.ndarray) -> Tuple[np.ndarray, Tuple]:
+        """
+        Copy an array into new shared memory owned by the engine. Returns the
+        shared array, and its ``(shared_mem, dtype, shape)``.
+        """
+        mem = SharedMemory(create=True, size=array.nbytes)
+        self._shared_memory.append(mem)
+        shared = array_from_shared_mem(mem, array.dtype, array.shape)
+        shared[...] = array
+        return shared, (mem, array.dtype, array.shape)
+
+    def share_boards(self) -> Sequence:
+        """
+        Move the two boards into shared memory, unless they are already there,
+        and return their ``(shared_mem, dtype, shape)``.
+        """
+        if self._shared_boards is None:
+            self.board_old, old = self.share(self.board_old)
+            self.board_new, new = self.share(self.board_new)
+            self._shared_boards = (old, new)
+        return self._shared_boards
+
+    def start_bot_workers(self):
+        shared_boards = self.share_boards()
+        self.workers = {
+            name: BotWorker(
+                bot=bot,
+                patch_bounds=self.players[name].patch_bounds,
+                boards=shared_boards,
+                safe=self.safe,
+                patches=self.patches if self.analysed[name] else None,
+            )
+            for name, bot in self.bots.items()
+        }
+
+    def start_strip_workers(self, nstrips: int):
+        shared_boards = self.share_boards()
+        nstrips = min(nstrips, self.config.ny)
+        self.patch_owners, patch_owners = self.share(self.patch_owners)
+        self.strip_tallies, tallies = self.share(
+            np.zeros((nstrips, len(STATS), len(self.bots) + 1), dtype=np.int64)
+        )
+        self.strip_hashes, hashes = self.share(np.zeros(nstrips, dtype=np.uint64))
+        # The cores are split between the strips for the numba threads
+        threads = max(
+            1, min((os.cpu_count() or 1) // nstrips, numba.config.NUMBA_NUM_THREADS)
+        )
+        ny = self.config.ny
+        self.strips = [
+            StripWorker(
+                boards=shared_boards,
+                rows=(s * ny // nstrips, (s + 1) * ny // nstrips),
+                patch_owners=patch_owners,
+                tallies=tallies,
+                hashes=hashes,
+                strip=s,
+                threads=threads,
+            )
+            for s in range(nstrips)
+        ]
+
+    def update_players(self):
+        """
+        Copy the number of cells and the tokens of each player, which are kept in
+        cell_counts and player_tokens during the game, to the Player objects.
+        """
+        for i, player in enumerate(self.players.values()):
+            player.update(ncells=int(self.cell_counts[i]))
+            player.tokens = int(self.player_tokens[i])
+
+    def close(self):
+        """
+        Update the players, stop the bot and strip processes, finish the
+        recording, and move the boards out of the shared memory owned by the
+        engine (if any).
+        """
+        self.update_players()
+        if self.workers is not None:
+            for worker in self.workers.values():
+                worker.close()
+            self.workers = None
+        if self.strips is not None:
+            for worker in self.strips:
+                worker.close()
+            self.strips = None
+            self.strip_tallies = self.strip_hashes = None
+        if self.recorder is not None:
+            self.recorder.close()
+        if self._shared_memory:
+            self.board_old = self.board_old.copy()
+            self.board_new = self.board_new.copy()
+            self.patch_owners = self.patch_owners.copy()
+            self._shared_boards = None
+            for mem in self._shared_memory:
+                mem.close()
+                mem.unlink()
+            self._shared_memory = []
+
+    def evolve(self, old: np.ndarray, new: np.ndarray):
+        if self.strips is not None:
+            index = int(self.board_index[0]) if self.swap_buffers else 0
+            for worker in self.strips:
+                worker.request(index)
+            for worker in self.strips:
+                worker.wait()
+            _reduce_tallies(
+                self.strip_tallies,
+                self.strip_hashes,
+                self.cell_counts,
+                self.cell_stats,
+                self.board_hash,
+            )
+            return
+        if self.tile_size is None:
+            bitpacked = self.packed_old.size > 0
+            self.evolve_board(
+                old,
+                new,
+                self.packed_old if bitpacked else self.xoff,
+                self.packed_new if bitpacked else self.yoff,
+                self.cell_counts,
+                self.cell_stats,
+                self.patch_owners,
+                self.board_hash,
+                self.config.nx,
+                self.config.ny,
+            )
+            return
+        # Activate the dirty tiles and their (periodic) neighbours
+        active = self.dirty_tiles
+        for axis in (0, 1):
+            active = active | np.roll(active, 1, axis) | np.roll(active, -1, axis)
+        self.active_tiles[...] = active
+        evolve_board_tiles(
+            old,
+            new,
+            self.active_tiles,
+            self.dirty_tiles,
             self.cell_counts,
-            config.nx,
-            config.ny,
+            self.cell_stats,
+            self.patch_owners,
+            self.board_hash,
+            self.tile_size,
+            self.config.nx,
+            self.config.ny,
         )
 
     def add_player_new_cells(self, player: Player, new_cells: Positions):
+        config = self.config
         x, y = new_cells.x, new_cells.y
         ntok = len(x)
+        tokens = self.player_tokens[player.number - 1]
         ok = True
         if ntok != len(y):
-            print(f"Player {player.name}: new cells x and y have different lengths.")
+            self.log(f"Player {player.name}: new cells x and y have different lengths.")
             ok = False
-        if ntok > player.tokens:
-            print(
+        if ntok > tokens:
+            self.log(
                 f"Player {player.name}: not enough tokens: needs {ntok}, "
-                f"has {player.tokens}."
+                f"has {tokens}."
             )
             ok = False
         x = (
@@ -133,27 +534,62 @@ class Engine:
             (np.asarray(y) % config.stepy) + (player.patch[0] * config.stepy)
         ) % config.ny
         if self.board_old[y, x].sum() > 0:
-            print(f"Player {player.name}: cannot overwrite alive cells.")
+            self.log(f"Player {player.name}: cannot overwrite alive cells.")
             ok = False
         if ok:
             self.board_old[y, x] = player.number
-            player.tokens -= ntok
+            if self.packed_old.size:
+                bits = np.left_shift(np.uint64(1), (x % 64).astype(np.uint64))
+                np.bitwise_or.at(self.packed_old, (y, x // 64), bits)
+            self.player_tokens[player.number - 1] -= ntok
+            added = np.unique(y * config.nx + x)
+            self.board_hash[0] ^= hash_cells(added, np.full_like(added, player.number))
+            self._placed = True
+            if (self.tile_size is not None) or self.packed_old.size:
+                # New cells are always inside the player's own patch
+                self.cell_counts[player.number - 1] += len(added)
+                self.cell_stats[STATS.index("inside"), player.number - 1] += len(added)
+            if self.tile_size is not None:
+                self.dirty_tiles[y // self.tile_size, x // self.tile_size] = True
+
+    @property
+    def board(self) -> np.ndarray:
+        """
+        The board that is handed to the bots.
+        """
+        return self.board_old if self.swap_buffers else self.board_new
 
     def call_player_bots(self, it: int):
-        for bot, player in zip(self.bots.values(), self.players.values()):
-            if player.ncells == 0:
+        if self.workers is not None:
+            self.call_bot_workers(it)
+            return
+        # All the bots see the same board: their replies are applied once they
+        # have all been called, in the order of the players (with swapped buffers,
+        # the bots are handed board_old, which receives the new cells)
+        board = self.board
+        analysis = BoardAnalysis(board, self.patches) if self.analysis else None
+        replies = []
+        for i, (name, bot, player) in enumerate(
+            zip(self.bots.keys(), self.bots.values(), self.players.values())
+        ):
+            if (self.cell_counts[i] == 0) or (it < self.wake_up[i]):
                 continue
-            self.board_new.setflags(write=False)
+            board.setflags(write=False)
             new_cells = None
             args = {
                 "iteration": int(it),
-                "board": self.board_new,
-                "patch": self.board_new[
+                "board": board,
+                "patch": board[
                     player.patch_bounds["ymin"] : player.patch_bounds["ymax"],
                     player.patch_bounds["xmin"] : player.patch_bounds["xmax"],
                 ],
-                "tokens": int(player.tokens),
+                "tokens": int(self.player_tokens[i]),
             }
+            if self.analysed[name]:
+                args["analysis"] = analysis
+            timeout = self.time_left(i)
+            wall = time.perf_counter()
+            cpu = time.process_time()
             if self.safe:
                 try:
                     new_cells = bot.iterate(**args)
@@ -161,55 +597,298 @@ class Engine:
                     pass
             else:
                 new_cells = bot.iterate(**args)
-            self.board_new.setflags(write=True)
-            if new_cells:
-                self.add_player_new_cells(player, new_cells)
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            board.setflags(write=True)
+            if self.record_time(i, it, wall, cpu, timeout):
+                replies.append((i, player, new_cells))
+        for reply in replies:
+            self.apply_bot_reply(*reply)
+
+    def call_bot_workers(self, it: int):
+        # All the bots are called at once, and their replies are then applied in
+        # the order of the players.
+        # A bot that misses its deadline keeps running in its process: it is not
+        # called again until its late reply has arrived, which is then dropped.
+        index = int(self.board_index[0]) if self.swap_buffers else 1
+        called = []
+        for i, (worker, player) in enumerate(
+            zip(self.workers.values(), self.players.values())
+        ):
+            if worker.busy is not None:
+                if not worker.poll():
+                    continue
+                late = worker.busy
+                _, wall, cpu = worker.reply()
+                self.record_time(i, late, wall, cpu)
+            if (self.cell_counts[i] == 0) or (it < self.wake_up[i]):
+                continue
+            worker.request(int(it), index, int(self.player_tokens[i]))
+            called.append((i, worker, player))
+        start = time.perf_counter()
+        for i, worker, player in called:
+            timeout = self.time_left(i)
+            wait = timeout
+            if wait is not None:
+                wait = max(0.0, wait - (time.perf_counter() - start))
+            if not worker.poll(wait):
+                wall = time.perf_counter() - start
+                self.record_time(i, it, wall, np.nan, timeout)
+                continue
+            new_cells, wall, cpu = worker.reply()
+            if self.record_time(i, it, wall, cpu, timeout):
+                self.apply_bot_reply(i, player, new_cells)
+
+    def time_left(self, i: int) -> Optional[float]:
+        """
+        Time bot ``i`` can take in the current iteration (None if unlimited).
+        """
+        limits = []
+        if self.time_limit is not None:
+            limits.append(self.time_limit)
+        if self.round_time_limit is not None:
+            limits.append(self.round_time_limit - self.round_times[i])
+        return min(limits) if limits else None
+
+    def record_time(
+        self,
+        i: int,
+        it: int,
+        wall: float,
+        cpu: float,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """
+        Record the time bot ``i`` took in iteration ``it``, and return whether it
+        stayed within the ``timeout`` it was given.
+        """
+        # The late reply of a worker replaces the time recorded at its deadline
+        self.round_times[i] += wall - np.nan_to_num(self.bot_times[0, i, it])
+        self.bot_times[:, i, it] = wall, cpu
+        if (self.round_time_limit is not None) and (
+            self.round_times[i] >= self.round_time_limit
+        ):
+            self.wake_up[i] = self.iterations + 1
+        if (timeout is None) or (wall <= timeout):
+            return True
+        self.overruns[i] += 1
+        return False
+
+    def apply_bot_reply(self, i: int, player: Player, new_cells):
+        if isinstance(new_cells, Sleep):
+            # A bot that has used up its round time is not woken up again
+            self.wake_up[i] = max(self.wake_up[i], new_cells.until)
+            new_cells = new_cells.positions
+        if new_cells:
+            self.add_player_new_cells(player, new_cells)
+
+    def step(self):
+        self.evolve(self.board_old, self.board_new)
+        # The packed occupancy of board_new was fully written by the kernel, and
+        # is now that of board_old (in both modes)
+        self.packed_old, self.packed_new = self.packed_new, self.packed_old
+        if self.swap_buffers:
+            self.board_old, self.board_new = self.board_new, self.board_old
+            self.board_index[0] = 1 - self.board_index[0]
+        elif self.tile_size is not None:
+            # Only the tiles where a cell changed differ between the two boards
+            copy_tiles(
+                self.board_new,
+                self.board_old,
+                self.dirty_tiles,
+                self.tile_size,
+                self.config.nx,
+                self.config.ny,
+            )
+        else:
+            self.board_old[...] = self.board_new[...]
 
     def update(self, it: int):
+        # The tokens and cell counts of the players are kept in player_tokens and
+        # cell_counts during the game (see update_players)
         if it % self.token_interval == 0:
-            for player in [p for p in self.players.values() if p.ncells > 0]:
-                player.tokens += 1
+            self.player_tokens[self.cell_counts > 0] += 1
         self.call_player_bots(it)
-        evolve_board(
+        self.step()
+        self.player_histories[:, it] = self.cell_counts
+        self.player_stats[:, :, it] = self.cell_stats
+        self.hash_history[it] = self.board_hash[0]
+        if self.recorder is not None:
+            self.recorder.record(it, self.board_old, self.cell_counts)
+
+    def idle_until(self, it: int) -> int:
+        """
+        First iteration, from ``it`` onwards, at which a bot that is alive has to
+        be called (or the board has to be checked for a cycle).
+        """
+        stop = int(
+            np.min(self.wake_up[self.cell_counts > 0], initial=self.iterations + 1)
+        )
+        if self.detect_cycles and self.bots_done():
+            # The board is checked for a cycle after a few iterations, and then
+            # less and less often while it does not repeat itself
+            checked = min(max(len(self._hashes), 2), CYCLE_CHECK_INTERVAL)
+            stop = min(stop, it + checked)
+        if self._cycle is not None:
+            stop = min(stop, self._cycle[0] + 1)
+        return max(it, stop)
+
+    def update_idle(self, start: int, stop: int):
+        """
+        Run the iterations from ``start`` to ``stop`` (excluded) in a single
+        compiled loop, while all the bots are asleep.
+        """
+        odd = evolve_steps(
+            self.kernel,
             self.board_old,
             self.board_new,
             self.xoff,
             self.yoff,
+            self.packed_old,
+            self.packed_new,
             self.cell_counts,
-            config.nx,
-            config.ny,
+            self.cell_stats,
+            self.patch_owners,
+            self.board_hash,
+            self.config.nx,
+            self.config.ny,
+            self.player_histories,
+            self.player_stats,
+            self.hash_history,
+            self.player_tokens,
+            self.token_interval,
+            start,
+            stop,
         )
-        self.board_old[...] = self.board_new[...]
-        for i, player in enumerate(self.players.values()):
-            player.update(ncells=self.cell_counts[i])
-        self.player_histories[:, it] = self.cell_counts
-        self.player_tokens[...] = np.array([p.tokens for p in self.players.values()])
+        if odd:
+            self.packed_old, self.packed_new = self.packed_new, self.packed_old
+        if self.swap_buffers:
+            if odd:
+                self.board_old, self.board_new = self.board_new, self.board_old
+                self.board_index[0] = 1 - self.board_index[0]
+        elif odd:
+            self.board_old[...] = self.board_new[...]
+        else:
+            self.board_new[...] = self.board_old[...]
+
+    def timings(self) -> dict:
+        return {
+            name: {
+                "wall": self.bot_times[0, i],
+                "cpu": self.bot_times[1, i],
+                "overruns": int(self.overruns[i]),
+            }
+            for i, name in enumerate(self.players)
+        }
 
     def write_scores(self):
         histories = {
             name: self.player_histories[i] for i, name in enumerate(self.players)
         }
-        finalize_scores(histories, test=self._test)
+        finalize_scores(histories, test=self._test, timings=self.timings())
 
     def write_results(self, show_results: bool = False):
         results = {}
-        fname = "results-" + time.strftime("%Y%m%d-%H%M%S") + ".npz"
         results["board"] = self.board_old
         for i, (name, player) in enumerate(self.players.items()):
             results[f"{name}_history"] = self.player_histories[i]
+            results[f"{name}_stats"] = self.player_stats[:, i]
             results[f"{name}_color"] = player.color
-        np.savez(fname, **results)
-        plot(fname=fname.replace(".npz", ".pdf"), show=show_results, **results)
+        save_results(results, sink=self.results, pdf=self.pdf, show=show_results)
         return results
 
+    def bots_done(self) -> bool:
+        """
+        Whether none of the bots that are alive will be called again in the round
+        (they are asleep until after the end, or out of time), so that no more
+        cells can be placed.
+        """
+        alive = self.cell_counts > 0
+        return bool(np.all(self.wake_up[alive] > self.iterations))
+
+    def find_cycle(self, it: int) -> int:
+        """
+        Return the period of the cycle the board is in at iteration ``it``, or 0
+        if no cycle was found (yet). The board hashes recorded since the last
+        check are searched for a repeat, which is only trusted once the board is
+        found to be identical one period later.
+        """
+        if self._placed:
+            self._hashes.clear()
+            self._cycle = None
+            self._placed = False
+        for k in range(self._checked + 1, it + 1):
+            h = int(self.hash_history[k])
+            if (self._cycle is None) and (h in self._hashes):
+                period = k - self._hashes[h]
+                self._cycle = (it + period, period, self.board_old.copy())
+            self._hashes[h] = k
+        self._checked = it
+        if self._cycle is not None:
+            check, period, snapshot = self._cycle
+            if it >= check:
+                self._cycle = None
+                if (it == check) and np.array_equal(snapshot, self.board_old):
+                    return period
+        return 0
+
+    def fast_forward(self, it: int, period: int):
+        """
+        Jump from iteration ``it`` to the end of the round, for a board cycling
+        with the given period. The histories are filled in from the last cycle,
+        and only the last ``remaining % period`` steps are simulated.
+        """
+        remaining = self.iterations - it
+        source = it - period + 1 + np.arange(remaining) % period
+        self.player_histories[:, it + 1 :] = self.player_histories[:, source]
+        self.player_stats[:, :, it + 1 :] = self.player_stats[:, :, source]
+        for _ in range(remaining % period):
+            self.step()
+        # Tokens keep coming in for the players that are alive
+        iters = np.arange(it + 1, self.iterations + 1)
+        grants = iters[iters % self.token_interval == 0]
+        self.player_tokens += (self.player_histories[:, grants - 1] > 0).sum(axis=1)
+
     def run(self, show_results: bool = False):
-        for it in range(1, self.iterations + 1):
-            self.update(it)
-        print(f"Reached {it} iterations.")
+        it = self.run_round()
+        self.log(f"Reached {it} iterations.")
         self.write_scores()
         results = self.write_results(show_results)
         return results
 
+    def run_round(self) -> int:
+        """
+        Run all the iterations of the round (without writing scores or results),
+        and return the number of iterations reached.
+        """
+        it = 0
+        while it < self.iterations:
+            # When all the bots are asleep, run the steps without calling them
+            stop = self.idle_until(it + 1)
+            if (
+                (stop > it + 1)
+                and (self.tile_size is None)
+                and (self.strips is None)
+                and (self.recorder is None)
+            ):
+                self.update_idle(it + 1, stop)
+                it = stop - 1
+            else:
+                it += 1
+                self.update(it)
+            if (
+                self.detect_cycles
+                and (self.recorder is None)
+                and self.bots_done()
+                and (period := self.find_cycle(it))
+            ):
+                self.log(f"Board is cycling with period {period} at iteration {it}.")
+                self.fast_forward(it, period)
+                it = self.iterations
+                break
+        self.close()
+        return it
+
 
 class GraphicalEngine(Engine):
     def __init__(
@@ -221,8 +900,24 @@ class GraphicalEngine(Engine):
         fps: Optional[int] = None,
         safe: bool = False,
         test: bool = True,
+        swap_buffers: bool = False,
+        kernel: str = "modulo",
+        tile_size: Optional[int] = None,
+        bot_processes: bool = False,
+        time_limit: Optional[float] = None,
+        round_time_limit: Optional[float] = None,
+        record: Optional[str] = None,
+        analysis: bool = False,
+        strips: Optional[int] = None,
+        playing: Optional[Event] = None,
+        config: Optional[Config] = None,
     ):
         self.niter = 0
+        arrays = {key: array_from_shared_mem(*value) for key, value in buffers.items()}
+        # Complete iterations are handed to the viewer through the exchange, and
+        # the engine waits on the playing event while the game is paused
+        self.exchange = FrameExchange(arrays)
+        self.playing = playing
 
         super().__init__(
             bots=bots,
@@ -230,9 +925,18 @@ class GraphicalEngine(Engine):
             iterations=iterations,
             safe=safe,
             test=test,
-            buffers={
-                key: array_from_shared_mem(*value) for key, value in buffers.items()
-            },
+            swap_buffers=swap_buffers,
+            kernel=kernel,
+            tile_size=tile_size,
+            bot_processes=bot_processes,
+            shared_boards=(buffers["board_old"], buffers["board_new"]),
+            strips=strips,
+            time_limit=time_limit,
+            round_time_limit=round_time_limit,
+            record=record,
+            analysis=analysis,
+            config=config,
+            buffers=arrays,
         )
         if fps:
             self.time_delta = 1 / fps
@@ -240,22 +944,42 @@ class GraphicalEngine(Engine):
         else:
             self.run = self.run_unconstrained
 
+    def wait_while_paused(self) -> bool:
+        """
+        Block (without using the CPU) while the game is paused, and return
+        whether the game should go on.
+        """
+        if self.playing is not None:
+            self.playing.wait()
+        elif not self.game_flow[0]:
+            time.sleep(0.01)
+            return False
+        return not self.game_flow[1]
+
+    def publish(self):
+        self.exchange.publish(self.board_old, self.niter)
+
     def run_unconstrained(self):
         while self.niter < self.iterations and not self.game_flow[1]:
-            if self.game_flow[0]:
+            if self.wait_while_paused():
                 self.niter += 1
                 self.update(self.niter)
-        print(f"Reached {self.niter} iterations.")
+                self.publish()
+        self.log(f"Reached {self.niter} iterations.")
+        self.close()
         self.write_scores()
         self.game_flow[1] = True
 
     def run_with_fps(self):
         last_update = time.time()
         while self.niter < self.iterations and not self.game_flow[1]:
-            if self.game_flow[0] and (time.time() - last_update > self.time_delta):
+            if self.wait_while_paused():
+                time.sleep(max(0, last_update + self.time_delta - time.time()))
                 self.niter += 1
                 self.update(self.niter)
+                self.publish()
                 last_update = time.time()
-        print(f"Reached {self.niter} iterations.")
+        self.log(f"Reached {self.niter} iterations.")
+        self.close()
         self.write_scores()
         self.game_flow[1] = True
@@ -0,0 +1,134 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import Config
+from .engine import Engine, setup
+from .helpers import Positions
+
+
+class _Controlled:
+    """
+    Stands in for a bot whose placements are given to ``Environment.step``.
+    """
+
+    def __init__(self, placements: dict, name: str):
+        self.placements = placements
+        self.name = name
+
+    def iterate(self, **kwargs):
+        return self.placements.pop(self.name, None)
+
+
+class Environment:
+    """
+    A game that is driven one step at a time, for training bots. Nothing is
+    printed or written to disk, and the buffers are reused from one game to the
+    next.
+
+    The players listed in ``controlled`` are not played by their bots: their
+    placements are given to ``step`` instead. Their bots are only used for the
+    name, color and starting pattern. The other bots play as usual.
+
+    Parameters
+    ----------
+    bots:
+        The bots, as for ``setup``.
+    iterations:
+        Number of iterations of a game.
+    controlled:
+        Names of the players controlled through ``step``. Defaults to all of
+        them.
+    config:
+        The size of the board and patches (see ``Config``). Defaults to the
+        default config.
+    **kwargs:
+        Other arguments given to the ``Engine``.
+    """
+
+    def __init__(
+        self,
+        bots,
+        iterations: int,
+        controlled: Optional[Sequence[str]] = None,
+        config: Optional[Config] = None,
+        **kwargs,
+    ):
+        for option in ("bot_processes", "strips"):
+            if kwargs.get(option):
+                raise ValueError(f"The environment does not support {option}.")
+        self._bots = bots
+        self.iterations = iterations
+        self.controlled = controlled
+        self.config = config
+        self.placements = {}
+        self.buffers, players, dict_of_bots = setup(
+            bots=bots, iterations=iterations, config=config
+        )
+        self.engine = Engine(
+            bots=self._control(dict_of_bots),
+            players=players,
+            iterations=iterations,
+            buffers=self.buffers,
+            verbose=False,
+            config=config,
+            **kwargs,
+        )
+        self.iteration = 0
+
+    def _control(self, dict_of_bots: dict) -> dict:
+        names = dict_of_bots if self.controlled is None else self.controlled
+        for name in names:
+            dict_of_bots[name] = _Controlled(self.placements, name)
+        return dict_of_bots
+
+    def observation(self) -> Dict[str, np.ndarray]:
+        """
+        The current board, and the tokens and number of alive cells of each
+        player. These are views of the engine buffers: they are updated in
+        place by the next step, and must be copied to be kept.
+        """
+        return {
+            "board": self.engine.board_old,
+            "tokens": self.engine.player_tokens,
+            "counts": self.engine.cell_counts,
+        }
+
+    def reset(self, seed=None) -> Dict[str, np.ndarray]:
+        """
+        Start a new game with the given seed, and return the first observation.
+        """
+        _, players, dict_of_bots = setup(
+            bots=self._bots,
+            iterations=self.iterations,
+            seed=seed,
+            buffers=self.buffers,
+            config=self.config,
+        )
+        self.engine.use_buffers(
+            bots=self._control(dict_of_bots), players=players, buffers=self.buffers
+        )
+        self.engine.reset()
+        self.placements.clear()
+        self.iteration = 0
+        return self.observation()
+
+    def step(
+        self, placements: Optional[Dict[str, Positions]] = None
+    ) -> Tuple[Dict[str, np.ndarray], bool]:
+        """
+        Place the new cells of the controlled players (a dict of name:
+        Positions, in patch coordinates as returned by a bot), and evolve the
+        board by one iteration. Returns the observation, and whether the game
+        is over.
+        """
+        if self.iteration >= self.iterations:
+            raise RuntimeError("The game is over, call reset to start a new one.")
+        self.placements.clear()
+        if placements is not None:
+            self.placements.update(placements)
+        self.iteration += 1
+        self.engine.update(self.iteration)
+        return self.observation(), self.iteration == self.iterations
@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
-from typing import Dict
+from multiprocessing.synchronize import Event
+from typing import Dict, Optional
 
 import matplotlib.colors as mcolors
 import numpy as np
@@ -12,10 +13,13 @@ try:
 except ImportError:
     from PySide2 import QtWidgets as qw
 
-from . import config
+from .config import Config
+from .config import config as default_config
 from .player import Player
+from .recording import Replay
 from .scores import read_scores
-from .tools import array_from_shared_mem
+from .sync import FrameExchange
+from .tools import array_from_shared_mem, make_lut
 
 
 def _make_separator():
@@ -32,15 +36,24 @@ class Graphics:
         fps: int,
         test: bool,
         buffers,
+        downsample: int = 1,
+        playing: Optional[Event] = None,
+        config: Optional[Config] = None,
     ):
         self.players = players
+        self.config = default_config if config is None else config
         self.buffers = {
             key: array_from_shared_mem(*value) for key, value in buffers.items()
         }
         self.fps = fps
         self._test = test
         self.player_histories = self.buffers["player_histories"]
-        self.board = self.buffers["board_old"]
+        # The engine waits on this event while the game is paused
+        self.playing = playing
+        # Only complete iterations are shown: the latest one published by the
+        # engine is copied into this frame
+        self.exchange = FrameExchange(self.buffers)
+        self.frame = np.zeros_like(self.buffers["board_old"])
 
         self.app = pg.mkQApp("Cholerama")
         self.window = pg.GraphicsLayoutWidget()
@@ -49,19 +62,26 @@ class Graphics:
         self.left_view = self.window.addViewBox(None, col=0)
         self.left_view.setAspectLocked(True)
 
-        self.cmap = mcolors.ListedColormap(
-            ["black"] + [p.color for p in self.players.values()]
-        )
-        self.image = pg.ImageItem(image=self.cmap(self.board.T))
+        # The board is drawn as an index image through a lookup table of the
+        # player colors, keeping only one cell in ``downsample`` along each axis.
+        # It is only redrawn when the engine has moved on to a new iteration.
+        self.lut = make_lut([p.color for p in self.players.values()])
+        self.downsample = downsample
+        self.drawn = None
+        self.image = pg.ImageItem()
+        while self.drawn is None:
+            self.drawn = self.exchange.read(self.frame)
+        self.draw()
+        self.image.setRect(0, 0, self.config.nx, self.config.ny)
         self.left_view.addItem(self.image)
 
         self.outlines = []
         lw = 5
         for i, p in enumerate(self.players.values()):
-            x1 = p.patch[1] * config.stepx + lw / 2
-            x2 = (p.patch[1] + 1) * config.stepx - lw / 2
-            y1 = p.patch[0] * config.stepy + lw / 2
-            y2 = (p.patch[0] + 1) * config.stepy - lw / 2
+            x1 = p.patch_bounds["xmin"] + lw / 2
+            x2 = p.patch_bounds["xmax"] - lw / 2
+            y1 = p.patch_bounds["ymin"] + lw / 2
+            y2 = p.patch_bounds["ymax"] - lw / 2
             outl_x = np.array([x1, x2, x2, x1, x1])
             outl_y = np.array([y1, y1, y2, y2, y1])
             self.outlines.append(
@@ -86,10 +106,20 @@ class Graphics:
             )
         self.window.ci.layout.setColumnMaximumWidth(1, 300)
 
+    def draw(self):
+        board = self.frame[:: self.downsample, :: self.downsample]
+        self.image.setImage(
+            board.T, lut=self.lut, levels=(0, len(self.lut) - 1), autoLevels=False
+        )
+
     def update(self):
-        self.image.setImage(self.cmap(self.board.T))
-        for i, hist in enumerate(self.player_histories):
-            self.lines[i].setData(hist[:], self.xhistory)
+        if self.exchange.iteration() != self.drawn:
+            it = self.exchange.read(self.frame)
+            if it is not None:
+                self.drawn = it
+                self.draw()
+                for i, hist in enumerate(self.player_histories):
+                    self.lines[i].setData(hist[:], self.xhistory)
         self.update_tokenboard()
         if self.buffers["game_flow"][1]:
             self.update_leaderboard(read_scores(self.players.keys(), test=self._test))
@@ -109,7 +139,7 @@ class Graphics:
         for i, (name, score) in enumerate(sorted_scores.items()):
             self.score_boxes[i].setText(
                 f'<div style="color:{self.players[name].color}">&#9632;</div> '
-                f"{i+1}. {name[:config.max_name_length]}: {score}"
+                f"{i+1}. {name[:self.config.max_name_length]}: {score}"
             )
         sorted_peaks = dict(
             sorted(max_peaks.items(), key=lambda item: item[1], reverse=True)
@@ -117,14 +147,16 @@ class Graphics:
         for i, name in enumerate(list(sorted_peaks.keys())[:3]):
             self.peak_boxes[i].setText(
                 f'<div style="color:{self.players[name].color}">&#9632;</div> '
-                f"{i+1}. {name[:config.max_name_length]}: {sorted_peaks[name]}"
+                f"{i+1}. {name[:self.config.max_name_length]}: "
+                f"{sorted_peaks[name]}"
             )
 
     def update_tokenboard(self):
+        length = self.config.max_name_length
         for i, (name, p) in enumerate(self.players.items()):
             self.token_boxes[name].setText(
                 f'<div style="color:{p.color}">&#9632;</div> '
-                f"{name[:config.max_name_length]}: {self.buffers['player_tokens'][i]}"
+                f"{name[:length]}: {self.buffers['player_tokens'][i]}"
             )
 
     def run(self):
@@ -188,13 +220,121 @@ class Graphics:
         self.timer.start()
         pg.exec()
         self.buffers["game_flow"][1] = True
+        if self.playing is not None:
+            self.playing.set()
 
     def toggle_pause(self):
         if self.play_button.isChecked():
             for outline in self.outlines:
                 outline.setVisible(False)
             self.buffers["game_flow"][0] = True
+            if self.playing is not None:
+                self.playing.set()
             self.play_button.setText("Pause")
         else:
             self.buffers["game_flow"][0] = False
+            if self.playing is not None:
+                self.playing.clear()
             self.play_button.setText("Play")
+
+
+class ReplayGraphics:
+    """
+    Plays back a recorded game (see recording.Replay), with a slider to scrub
+    through the iterations, forwards and backwards.
+    """
+
+    def __init__(self, replay: Replay, fps: int = 30):
+        self.replay = replay
+        self.fps = fps
+        self.frame = 0
+        # Frames per tick while playing, negative to play backwards
+        self.speed = 1
+
+        self.app = pg.mkQApp("Cholerama replay")
+        self.window = pg.GraphicsLayoutWidget()
+        self.window.setBackground("#1a1a1a")
+        self.left_view = self.window.addViewBox(None, col=0)
+        self.left_view.setAspectLocked(True)
+
+        self.lut = make_lut(self.replay.colors)
+        self.image = pg.ImageItem()
+        self.left_view.addItem(self.image)
+
+        self.right_view = self.window.addPlot(row=None, col=1)
+        self.right_view.setLabel("bottom", text="Number of cells")
+        self.right_view.setLabel("left", text="Iterations")
+        for hist, color in zip(self.replay.histories, self.replay.colors):
+            self.right_view.plot(hist, self.replay.iterations, pen=color)
+        self.cursor = pg.InfiniteLine(pos=0, angle=0, pen="w")
+        self.right_view.addItem(self.cursor)
+        self.window.ci.layout.setColumnMaximumWidth(1, 300)
+
+    def show(self, frame: int):
+        self.frame = min(max(frame, 0), len(self.replay) - 1)
+        it = int(self.replay.iterations[self.frame])
+        self.image.setImage(
+            self.replay.board(it).T,
+            lut=self.lut,
+            levels=(0, len(self.lut) - 1),
+            autoLevels=False,
+        )
+        self.cursor.setPos(it)
+        self.label.setText(f"Iteration: {it}")
+        if self.slider.value() != self.frame:
+            self.slider.setValue(self.frame)
+
+    def tick(self):
+        if not self.play_button.isChecked():
+            return
+        self.show(self.frame + self.speed)
+        if self.frame in (0, len(self.replay) - 1):
+            self.play_button.setChecked(False)
+
+    def set_speed(self, speed: int):
+        self.speed = speed
+        self.play_button.setChecked(True)
+
+    def run(self):
+        main_window = qw.QMainWindow()
+        main_window.setWindowTitle(f"Cholerama replay: {self.replay.fname}")
+        main_window.setGeometry(0, 0, 1280, 800)
+
+        central_widget = qw.QWidget()
+        main_window.setCentralWidget(central_widget)
+        layout = qw.QVBoxLayout(central_widget)
+        layout.addWidget(self.window)
+
+        # Slider (arrow keys and page up/down also move it) and playback buttons
+        controls = qw.QHBoxLayout()
+        layout.addLayout(controls)
+        self.slider = qw.QSlider(QtCore.Qt.Horizontal)
+        self.slider.setRange(0, len(self.replay) - 1)
+        self.slider.setPageStep(self.replay.keyframe_interval)
+        self.slider.valueChanged.connect(self.show)
+        buttons = {
+            "|<": lambda: self.show(0),
+            "<<": lambda: self.set_speed(-10),
+            "<": lambda: self.set_speed(-1),
+            ">": lambda: self.set_speed(1),
+            ">>": lambda: self.set_speed(10),
+            ">|": lambda: self.show(len(self.replay) - 1),
+        }
+        for text, action in buttons.items():
+            button = qw.QPushButton(text)
+            button.clicked.connect(action)
+            controls.addWidget(button)
+        self.play_button = qw.QPushButton("Play/Pause")
+        self.play_button.setCheckable(True)
+        controls.addWidget(self.play_button)
+        controls.addWidget(self.slider)
+        self.label = qw.QLabel()
+        controls.addWidget(self.label)
+        self.show(0)
+
+        main_window.show()
+        self.timer = QtCore.QTimer()
+        self.timer.timeout.connect(self.tick)
+        self.timer.setInterval(1000 // self.fps)
+        self.timer.start()
+        pg.exec()
@@ -1,37 +1,113 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
 from dataclasses import dataclass
-from typing import Tuple, Union
+from typing import List, Optional, Sequence, Tuple, Union
 
 import numpy as np
-from numpy.lib.stride_tricks import sliding_window_view
-from PIL import Image
+
+from .compute import evolve_candidates
+
+Size = Union[int, Tuple[int, int]]
+
+
+class EmptyRegions:
+    """
+    Find empty regions of any size in a board, using its integral image (the
+    number of alive cells above and to the left of each point). Checking a
+    region takes four lookups whatever its size, so the search is exact and
+    linear in the size of the board.
+
+    The integral image can be carried over from one iteration to the next with
+    ``update``, which only recomputes it from the first row that changed.
+
+    Parameters:
+    ----------
+    board : numpy array
+        The current state of the board (or of a patch).
+    """
+
+    def __init__(self, board: np.ndarray):
+        ny, nx = board.shape
+        self.occupied = np.zeros((ny, nx), dtype=bool)
+        # Cumulative sums along each row, and down the columns of those
+        self._rows = np.zeros((ny, nx + 1), dtype=np.int32)
+        self.integral = np.zeros((ny + 1, nx + 1), dtype=np.int32)
+        self.update(board)
+
+    def update(self, board: np.ndarray):
+        """
+        Update the integral image for a new state of the board.
+
+        Parameters:
+        ----------
+        board : numpy array
+            The new state of the board, with the same shape as before.
+        """
+        occupied = board > 0
+        changed = np.flatnonzero((occupied != self.occupied).any(axis=1))
+        if len(changed) == 0:
+            return
+        self.occupied = occupied
+        self._rows[changed, 1:] = np.cumsum(occupied[changed], axis=1)
+        first = changed[0]
+        below = self.integral[first + 1 :]
+        np.cumsum(self._rows[first:], axis=0, out=below)
+        below += self.integral[first]
+
+    def find(
+        self, size: Union[Size, List[Size]], skip: int = 1
+    ) -> Union[np.ndarray, List[np.ndarray]]:
+        """
+        Find all empty regions of a given size.
+
+        Parameters:
+        ----------
+        size : int, tuple or list
+            The size of the region to search for, or a list of sizes.
+        skip : int
+            Only return regions whose indices are multiples of ``skip``.
+
+        Returns:
+        -------
+        numpy array, or list of numpy arrays if a list of sizes was given
+            The [y, x] indices of the bottom-left corner of each empty patch.
+        """
+        if isinstance(size, list):
+            return [self.find(s, skip=skip) for s in size]
+        h, w = (size, size) if isinstance(size, int) else size
+        s = self.integral
+        counts = (
+            s[h::skip, w::skip]
+            - s[:-h:skip, w::skip]
+            - s[h::skip, :-w:skip]
+            + s[:-h:skip, :-w:skip]
+        )
+        return np.argwhere(counts == 0) * skip
 
 
 def find_empty_regions(
-    board: np.ndarray, size: Union[int, Tuple[int, int]], skip: int = 4
-) -> np.ndarray:
+    board: np.ndarray, size: Union[Size, List[Size]], skip: int = 4
+) -> Union[np.ndarray, List[np.ndarray]]:
     """
-    Find all empty regions of a given size in the board.
+    Find all empty regions of a given size in the board. The search is exact,
+    and its cost does not depend on the size of the regions (see
+    ``EmptyRegions``, which can also be updated from one iteration to the next).
 
     Parameters:
     ----------
     board : numpy array
         The current state of the board.
-    size : int or tuple
-        The size of the region to search for.
+    size : int, tuple or list
+        The size of the region to search for, or a list of sizes.
     skip : int
-        The step size for the sliding window. The larger the faster, but less accurate.
+        Only return regions whose indices are multiples of ``skip``.
 
     Returns:
     -------
-    numpy array
+    numpy array, or list of numpy arrays if a list of sizes was given
         The [y, x] indices of the bottom-left corner of each empty patch.
     """
-    if isinstance(size, int):
-        size = (size, size)
-    view = sliding_window_view(board, size)[::skip, ::skip, ...]
-    return np.argwhere(view.sum((2, 3)) == 0) * skip
+    return EmptyRegions(board).find(size, skip=skip)
 
 
 def image_to_array(image_path: str) -> np.ndarray:
@@ -48,6 +124,8 @@ def image_to_array(image_path: str) -> np.ndarray:
     numpy array
         The image as a numpy array.
     """
+    from PIL import Image
+
     im = Image.open(image_path).convert("RGB")
     a = np.array(im)
     s = (a - 255).sum(axis=-1)
@@ -67,6 +145,75 @@ class Positions:
         return len(self.x)
 
 
+@dataclass
+class Sleep:
+    """
+    Can be returned by ``Bot.iterate`` instead of ``Positions``, to tell the
+    engine not to call the bot again before iteration ``until``. New cells can
+    still be placed at the same time with ``positions``.
+    """
+
+    until: int
+    positions: Optional[Positions] = None
+
+
+def simulate_placements(
+    window: np.ndarray,
+    candidates: Sequence[Positions],
+    player: int,
+    steps: int,
+    nplayers: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Evolve a window of the board a few steps ahead, once for each candidate set
+    of new cells, to compare placements. The game rules are the same as on the
+    board, but the cells outside the window are considered empty: the window
+    should include some margin around the area of interest. The candidates are
+    simulated in parallel.
+
+    Parameters:
+    ----------
+    window : numpy array
+        A part of the board (for instance the patch, or a slice of the board).
+    candidates : list of Positions
+        The sets of new cells to try, in window coordinates (they wrap around
+        the window). As on the board, a set that overlaps alive cells is not
+        placed.
+    player : int
+        The number of the player placing the cells.
+    steps : int
+        The number of iterations to simulate.
+    nplayers : int
+        The number of players. Defaults to the largest player number in the
+        window, or ``player``.
+
+    Returns:
+    -------
+    numpy array
+        The number of alive cells of each player (column ``k`` for player
+        ``k + 1``) in the window after ``steps`` iterations, for each
+        candidate.
+    """
+    if nplayers is None:
+        nplayers = max(int(window.max(initial=0)), player)
+    ny, nx = window.shape
+    sizes = [len(c) for c in candidates]
+    starts = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+    xs = np.concatenate([np.asarray(c.x) for c in candidates] + [np.zeros(0)])
+    ys = np.concatenate([np.asarray(c.y) for c in candidates] + [np.zeros(0)])
+    counts = np.zeros((len(candidates), nplayers), dtype=int)
+    evolve_candidates(
+        np.ascontiguousarray(window),
+        xs.astype(np.int64) % nx,
+        ys.astype(np.int64) % ny,
+        starts,
+        player,
+        steps,
+        counts,
+    )
+    return counts
+
+
 def read_rle(fpath: str) -> Positions:
     with open(fpath) as f:
         lines = [line for line in f.readlines() if not line.startswith('#')]
@@ -1,18 +1,19 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
-import time
-from multiprocessing import Process
+from multiprocessing import Event, Process
 from multiprocessing.managers import SharedMemoryManager
 
-import numpy as np
-
 from .engine import GraphicalEngine, setup
-from .graphics import Graphics
-from .plot import plot
+from .recording import Replay
+from .results import SINKS, save_results
+from .sync import FrameExchange
 from .tools import array_from_shared_mem
 
 
 def spawn_graphics(*args):
+    # Qt is only imported in the process that shows the game
+    from .graphics import Graphics
+
     graphics = Graphics(*args)
     graphics.run()
 
@@ -23,17 +24,51 @@ def spawn_engine(*args):
 
 
 def play(
-    bots, iterations, seed=None, fps=None, safe=False, test=True, show_results=False
+    bots,
+    iterations,
+    seed=None,
+    fps=None,
+    safe=False,
+    test=True,
+    show_results=False,
+    swap_buffers=False,
+    kernel="modulo",
+    tile_size=None,
+    bot_processes=False,
+    time_limit=None,
+    round_time_limit=None,
+    record=None,
+    downsample=1,
+    analysis=False,
+    config=None,
+    strips=None,
+    results="npz",
+    pdf=False,
 ):
-    buffers, players, dict_of_bots = setup(bots=bots, iterations=iterations, seed=seed)
-    results = {"board": buffers["board_old"]}
-    results.update(
+    if results not in SINKS:
+        raise ValueError(f"Unknown results sink {results}, must be one of {SINKS}.")
+    buffers, players, dict_of_bots = setup(
+        bots=bots, iterations=iterations, seed=seed, config=config
+    )
+    game = {"board": buffers["board_old"]}
+    game.update(
         {
             f"{name}_history": buffers["player_histories"][i]
             for i, name in enumerate(players)
         }
     )
-    results.update({f"{name}_color": player.color for name, player in players.items()})
+    game.update(
+        {
+            f"{name}_stats": buffers["player_stats"][:, i]
+            for i, name in enumerate(players)
+        }
+    )
+    game.update({f"{name}_color": player.color for name, player in players.items()})
+
+    buffers.update(
+        FrameExchange.allocate(buffers["board_old"].shape, buffers["board_old"].dtype)
+    )
+    playing = Event()
 
     shared_arrays = {}
     with SharedMemoryManager() as smm:
@@ -43,14 +78,18 @@ def play(
             shared_arrays[key] = array_from_shared_mem(mem, arr.dtype, arr.shape)
             shared_arrays[key][...] = arr
             shared_buffers[key] = (mem, arr.dtype, arr.shape)
+        FrameExchange(shared_arrays).publish(shared_arrays["board_old"], 0)
 
         graphics = Process(
             target=spawn_graphics,
             args=(
                 players,
-                30,
+                60,
                 test,
                 shared_buffers,
+                downsample,
+                playing,
+                config,
             ),
         )
 
@@ -64,6 +103,17 @@ def play(
                 fps,
                 safe,
                 test,
+                swap_buffers,
+                kernel,
+                tile_size,
+                bot_processes,
+                time_limit,
+                round_time_limit,
+                record,
+                analysis,
+                strips,
+                playing,
+                config,
             ),
         )
 
@@ -72,11 +122,21 @@ def play(
         graphics.join()
         engine.join()
 
-        fname = "results-" + time.strftime("%Y%m%d-%H%M%S") + ".npz"
-        results["board"][...] = shared_arrays["board_old"][...]
+        live = ("board_old", "board_new")[shared_arrays["board_index"][0]]
+        game["board"][...] = shared_arrays[live][...]
         for i, name in enumerate(players):
-            results[f"{name}_history"][...] = shared_arrays["player_histories"][i][...]
+            game[f"{name}_history"][...] = shared_arrays["player_histories"][i][...]
+            game[f"{name}_stats"][...] = shared_arrays["player_stats"][:, i][...]
+
+    save_results(game, sink=results, pdf=pdf, show=show_results)
+    return game
+
+
+def replay(fname, fps=30):
+    """
+    Play back a game recorded with ``record=fname``, in a window where the
+    iterations can be scrubbed through.
+    """
+    from .graphics import ReplayGraphics
 
-    np.savez(fname, **results)
-    plot(fname=fname.replace(".npz", ".pdf"), show=show_results, **results)
-    return results
+    ReplayGraphics(Replay(fname), fps=fps).run()
@@ -1,17 +1,26 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
-from typing import Union
+from typing import Optional, Union
 
 import numpy as np
 
-from . import config
+from .config import Config
+from .config import config as default_config
 from .helpers import Positions, image_to_array
 
 
 class Player:
     def __init__(
-        self, name: str, number: int, color: str, pattern: Union[np.ndarray, str], patch
+        self,
+        name: str,
+        number: int,
+        color: str,
+        pattern: Union[np.ndarray, str],
+        patch,
+        config: Optional[Config] = None,
     ):
+        if config is None:
+            config = default_config
         self.name = name
         self.number = number
         self.color = color
@@ -32,12 +41,11 @@ class Player:
                 f"{len(self.pattern)} > {config.initial_tokens}."
             )
 
-        patch_size = (config.nx // config.npatches[1], config.ny // config.npatches[0])
         self.patch_bounds = {
-            "xmin": patch[1] * patch_size[1],
-            "xmax": (patch[1] + 1) * patch_size[1],
-            "ymin": patch[0] * patch_size[0],
-            "ymax": (patch[0] + 1) * patch_size[0],
+            "xmin": patch[1] * config.stepx,
+            "xmax": (patch[1] + 1) * config.stepx,
+            "ymin": patch[0] * config.stepy,
+            "ymax": (patch[0] + 1) * config.stepy,
         }
         self.ncells = len(self.pattern)
         self.tokens = config.initial_tokens - self.ncells
@@ -2,21 +2,37 @@
 
 import glob
 
-import matplotlib.colors as mcolors
-import matplotlib.pyplot as plt
 import numpy as np
 
+from .results import flush_results
 
-def load(file=None):
+
+def load(file=None, game=-1):
+    """
+    Load the results of a game, by default from the latest results file in the
+    current directory. In a record of several games (``results="record"``),
+    ``game`` is the number of the game (the last one by default).
+    """
+    # The results of this process may still be queued for writing
+    flush_results()
     if file is None:
         file = sorted(glob.glob("results-*.npz"))[-1]
     print("Loading:", file)
+    data = np.load(file)
+    games = sorted({key.split("/")[0] for key in data.files if "/" in key}, key=int)
+    prefix = f"{games[game]}/" if games else ""
     return {
-        key: value if value.shape else value[()] for key, value in np.load(file).items()
+        key[len(prefix) :]: value if value.shape else value[()]
+        for key, value in data.items()
+        if key.startswith(prefix)
     }
 
 
 def plot(*, board, show=True, fname=None, **players):
+    # Imported here, so that matplotlib is only loaded when something is plotted
+    import matplotlib.colors as mcolors
+    import matplotlib.pyplot as plt
+
     plt.ioff()
     fig, ax = plt.subplots(2, 1, figsize=(9, 9))
     colors = {
@@ -0,0 +1,216 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import json
+import queue
+import struct
+import threading
+import zlib
+import numpy as np
+
+MAGIC = b"CHOLREC1"
+
+
+def _encode_delta(previous: np.ndarray, current: np.ndarray) -> bytes:
+    # A cell can only be born on an empty cell, or die: the owners are only
+    # needed for the births, deaths are found from the previous frame. The
+    # indices are sorted, their differences are small and compress well.
+    indices = np.flatnonzero(current != previous)
+    steps = np.diff(indices, prepend=0).astype(np.uint32)
+    owners = current[indices[previous[indices] == 0]]
+    return struct.pack("<I", len(indices)) + steps.tobytes() + owners.tobytes()
+
+
+class Recorder:
+    """
+    Records a game to disk, as the cells that changed at every iteration (their
+    indices, and the owners of the new cells), plus a full keyframe every
+    ``keyframe_interval`` iterations. Each frame is compressed separately, and
+    an index of the frames is written at the end of the file, so that any
+    iteration can be rebuilt from the nearest keyframe.
+
+    The frames are compared, compressed and written by a background thread,
+    so that the engine only pays for a copy of the board. The engine is only
+    held up if the thread falls more than ``max_pending`` frames behind.
+
+    Parameters
+    ----------
+    fname:
+        Name of the recording file.
+    board:
+        The starting board, recorded as the first keyframe (iteration 0).
+    counts:
+        The starting number of cells of each player.
+    players:
+        The players, whose names and colors are stored with the recording.
+    keyframe_interval:
+        Number of iterations between two keyframes.
+    level:
+        The zlib compression level.
+    max_pending:
+        Number of frames that can wait for the background thread.
+    """
+
+    def __init__(
+        self,
+        fname: str,
+        board: np.ndarray,
+        counts: np.ndarray,
+        players: dict,
+        keyframe_interval: int = 50,
+        level: int = 1,
+        max_pending: int = 64,
+    ):
+        self.fname = fname
+        self.keyframe_interval = keyframe_interval
+        self.level = level
+        self.metadata = {
+            "ny": board.shape[0],
+            "nx": board.shape[1],
+            "dtype": board.dtype.str,
+            "keyframe_interval": keyframe_interval,
+            "names": list(players),
+            "colors": [player.color for player in players.values()],
+        }
+        self.iterations = []
+        self.offsets = []
+        self.keyframes = []
+        self.counts = []
+        self._previous = None
+        self._error = None
+        self._file = open(fname, "wb")
+        self._file.write(MAGIC)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._write_frames, daemon=True)
+        self._thread.start()
+        self.record(0, board, counts)
+
+    def record(self, it: int, board: np.ndarray, counts: np.ndarray):
+        """
+        Record the board and the number of cells of each player at iteration
+        ``it``.
+        """
+        self._queue.put((it, board.copy(), counts.tolist()))
+
+    def _write_frames(self):
+        try:
+            while (frame := self._queue.get()) is not None:
+                self._write_frame(*frame)
+        except Exception as error:
+            self._error = error
+            # Keep emptying the queue, so that the engine is never held up
+            while self._queue.get() is not None:
+                pass
+
+    def _write_frame(self, it: int, board: np.ndarray, counts: list):
+        flat = board.ravel()
+        if (self._previous is None) or (it % self.keyframe_interval == 0):
+            data = flat.tobytes()
+            self.keyframes.append(it)
+        else:
+            data = _encode_delta(self._previous, flat)
+        self.iterations.append(it)
+        self.counts.append(counts)
+        self.offsets.append(self._file.tell())
+        self._file.write(zlib.compress(data, self.level))
+        self._previous = flat
+
+    def close(self) -> str:
+        """
+        Wait for the pending frames to be written, and write the index of the
+        frames at the end of the file. Returns the name of the file.
+        """
+        if self._file.closed:
+            return self.fname
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            self._file.close()
+            raise self._error
+        # The end of the last frame is also the start of the index
+        self.offsets.append(self._file.tell())
+        index = dict(
+            self.metadata,
+            iterations=self.iterations,
+            offsets=self.offsets,
+            keyframes=self.keyframes,
+            counts=self.counts,
+        )
+        footer = json.dumps(index).encode()
+        self._file.write(footer)
+        self._file.write(struct.pack("<Q", len(footer)))
+        self._file.close()
+        return self.fname
+
+
+class Replay:
+    """
+    Reads a game recorded by ``Recorder``. The file is memory-mapped, and only
+    the frames needed to rebuild an iteration are decompressed: the nearest
+    keyframe before it, and the deltas from there. Stepping forward from the
+    last iteration that was read only applies the new deltas.
+
+    Parameters
+    ----------
+    fname:
+        Name of the recording file.
+    """
+
+    def __init__(self, fname: str):
+        self.fname = fname
+        self._data = np.memmap(fname, dtype=np.uint8, mode="r")
+        if bytes(self._data[: len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{fname} is not a cholerama recording.")
+        (size,) = struct.unpack("<Q", bytes(self._data[-8:]))
+        index = json.loads(bytes(self._data[-8 - size : -8]))
+        self.shape = (index["ny"], index["nx"])
+        self.dtype = np.dtype(index["dtype"])
+        self.keyframe_interval = index["keyframe_interval"]
+        self.names = index["names"]
+        self.colors = index["colors"]
+        self.iterations = np.array(index["iterations"])
+        self.offsets = np.array(index["offsets"])
+        self.keyframes = np.isin(self.iterations, index["keyframes"])
+        # Frame of the keyframe each frame starts from
+        self._keyframe = np.maximum.accumulate(
+            np.where(self.keyframes, np.arange(len(self.iterations)), 0)
+        )
+        # Number of cells of each player, with shape (players, iterations)
+        self.histories = np.array(index["counts"]).T
+        self._board = np.zeros(self.shape[0] * self.shape[1], dtype=self.dtype)
+        self._frame = -1
+
+    def __len__(self) -> int:
+        return len(self.iterations)
+
+    def _read(self, frame: int) -> bytes:
+        start, end = self.offsets[frame], self.offsets[frame + 1]
+        return zlib.decompress(self._data[start:end])
+
+    def _apply(self, frame: int):
+        data = self._read(frame)
+        if self.keyframes[frame]:
+            self._board[...] = np.frombuffer(data, dtype=self.dtype)
+        else:
+            (n,) = struct.unpack("<I", data[:4])
+            steps = np.frombuffer(data, dtype=np.uint32, count=n, offset=4)
+            indices = np.cumsum(steps, dtype=np.int64)
+            born = self._board[indices] == 0
+            self._board[indices[~born]] = 0
+            self._board[indices[born]] = np.frombuffer(
+                data, dtype=self.dtype, offset=4 + 4 * n
+            )
+        self._frame = frame
+
+    def board(self, it: int) -> np.ndarray:
+        """
+        The board at iteration ``it``. The returned array is reused by the next
+        call, and must be copied to be kept.
+        """
+        frame = int(np.searchsorted(self.iterations, it, side="right")) - 1
+        if (frame < 0) or (self.iterations[frame] != it):
+            raise IndexError(f"Iteration {it} was not recorded.")
+        keyframe = self._keyframe[frame]
+        start = self._frame + 1 if keyframe <= self._frame <= frame else keyframe
+        for k in range(start, frame + 1):
+            self._apply(k)
+        return self._board.reshape(self.shape)
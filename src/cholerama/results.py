@@ -0,0 +1,239 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import atexit
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import zipfile
+from typing import Dict, Optional
+
+import numpy as np
+
+# Where the results of a game can be written (see ResultWriter)
+SINKS = (None, "npz", "record")
+
+_counter = itertools.count()
+
+
+def unique_name(prefix: str = "results", ext: str = ".npz") -> str:
+    """
+    Create an empty file with a new name, and return the name. The name starts
+    with the date and time, so that the files sort in the order they were
+    created, followed by the microseconds, the process id and a counter. The
+    file is created exclusively: if the name is already taken (for instance on
+    a disk shared with other machines), the next counter value is tried.
+    """
+    while True:
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+        usec = int((now % 1) * 1e6)
+        fname = f"{prefix}-{stamp}-{usec:06d}-{os.getpid()}-{next(_counter)}{ext}"
+        try:
+            open(fname, "xb").close()
+            return fname
+        except FileExistsError:
+            pass
+
+
+class ResultWriter:
+    """
+    Writes the results of games to disk on a background thread, so that the
+    engine only pays for a copy of the arrays. The sinks are:
+
+    - ``"npz"``: each game goes to its own compressed ``.npz`` file.
+    - ``"record"``: the games of the process are appended to a single
+      compressed ``.npz`` archive, under ``"{game}/{key}"`` (see ``plot.load``).
+      As for a recording, the index of the archive is only written when the
+      writer is flushed or closed.
+
+    Parameters
+    ----------
+    sink:
+        ``"npz"`` or ``"record"``.
+    level:
+        The zlib compression level.
+    max_pending:
+        Number of games that can wait for the background thread.
+    """
+
+    def __init__(self, sink: str, level: int = 1, max_pending: int = 16):
+        self.sink = sink
+        self._zip = dict(compression=zipfile.ZIP_DEFLATED, compresslevel=level)
+        self.pid = os.getpid()
+        self.fname = None
+        self.games = 0
+        self._archive = None
+        self._error = None
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._write_games, daemon=True)
+        self._thread.start()
+
+    def write(self, results: Dict[str, np.ndarray]) -> str:
+        """
+        Queue the results of a game, and return the name of the file they are
+        written to.
+        """
+        if self._error is not None:
+            raise self._error
+        game = None
+        if self.sink == "npz":
+            fname = unique_name()
+        else:
+            if self.fname is None:
+                self.fname = unique_name()
+            fname = self.fname
+            game = self.games
+            self.games += 1
+        arrays = {key: np.array(value) for key, value in results.items()}
+        self._queue.put((fname, game, arrays))
+        return fname
+
+    def _write_games(self):
+        while (item := self._queue.get()) is not None:
+            try:
+                if self._error is None:
+                    self._write_game(*item)
+                else:
+                    self._discard(*item)
+            except Exception as error:
+                self._error = error
+                self._discard(*item)
+            finally:
+                self._queue.task_done()
+        self._queue.task_done()
+
+    def _write_game(
+        self, fname: str, game: Optional[int], arrays: Dict[str, np.ndarray]
+    ):
+        # Same layout as np.savez_compressed, with a faster compression level
+        if game is None:
+            with zipfile.ZipFile(fname, "w", **self._zip) as archive:
+                self._write_arrays(archive, "", arrays)
+        else:
+            if self._archive is None:
+                self._archive = zipfile.ZipFile(fname, "a", **self._zip)
+            self._write_arrays(self._archive, f"{game}/", arrays)
+
+    @staticmethod
+    def _write_arrays(
+        archive: zipfile.ZipFile, prefix: str, arrays: Dict[str, np.ndarray]
+    ):
+        for key, value in arrays.items():
+            with archive.open(f"{prefix}{key}.npy", "w", force_zip64=True) as f:
+                np.lib.format.write_array(f, value)
+
+    def _discard(self, fname: str, game: Optional[int], arrays: Dict[str, np.ndarray]):
+        # Do not leave behind the empty (or partly written) file of a game that
+        # could not be written. A record file is kept once it holds other games.
+        if game not in (None, 0):
+            return
+        if self._archive is not None:
+            try:
+                self._archive.close()
+            except Exception:
+                pass
+            self._archive = None
+        try:
+            os.remove(fname)
+        except OSError:
+            pass
+
+    def flush(self):
+        """
+        Wait for the pending games to be written, and write the index of the
+        record file, so that it can be read. The next game is appended after it.
+        """
+        self._queue.join()
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+        if self._error is not None:
+            raise self._error
+
+    def close(self) -> Optional[str]:
+        """
+        Wait for the pending games to be written, and stop the thread. Returns
+        the name of the record file (if any).
+        """
+        if not self._thread.is_alive():
+            return self.fname
+        self._queue.put(None)
+        self._thread.join()
+        if self._archive is not None:
+            self._archive.close()
+        if self._error is not None:
+            raise self._error
+        return self.fname
+
+
+# One writer per sink and process, shared by all the games played in the process
+_writers: Dict[str, ResultWriter] = {}
+
+
+def save_results(
+    results: Dict[str, np.ndarray],
+    sink: Optional[str] = "npz",
+    pdf: bool = False,
+    show: bool = False,
+) -> Optional[str]:
+    """
+    Write the results of a game to ``sink`` (see ``ResultWriter``, nothing is
+    written if ``sink`` is None), in the background. The results are only
+    plotted if they are shown or saved as a PDF. Returns the name of the file
+    the results are written to. In a child process (for instance a worker of a
+    pool), the function waits for the results to be written.
+    """
+    if sink not in SINKS:
+        raise ValueError(f"Unknown results sink {sink}, must be one of {SINKS}.")
+    fname = None
+    if sink is not None:
+        writer = _writers.get(sink)
+        # A forked process does not inherit the thread of its parent's writer
+        if (writer is None) or (writer.pid != os.getpid()):
+            writer = _writers[sink] = ResultWriter(sink)
+        fname = writer.write(results)
+        # The exit handlers do not run in the worker processes of a pool (which
+        # may be terminated as soon as the last game is returned), so the games
+        # played there are written before returning
+        if multiprocessing.parent_process() is not None:
+            writer.flush()
+    if show or pdf:
+        import matplotlib.pyplot as plt
+
+        from .plot import plot
+
+        pdf_name = None
+        if pdf:
+            pdf_name = (
+                fname.replace(".npz", ".pdf")
+                if sink == "npz"
+                else unique_name(ext=".pdf")
+            )
+        fig, _ = plot(fname=pdf_name, show=show, **results)
+        # Do not keep the figures of a batch of games in memory
+        if not show:
+            plt.close(fig)
+    return fname
+
+
+def flush_results():
+    """
+    Wait for the results queued in this process to be written.
+    """
+    for writer in _writers.values():
+        if writer.pid == os.getpid():
+            writer.flush()
+
+
+@atexit.register
+def close_writers():
+    """
+    Finish writing the results, and close the record files.
+    """
+    for writer in _writers.values():
+        if writer.pid == os.getpid():
+            writer.close()
+    _writers.clear()
@@ -2,7 +2,7 @@
 
 import json
 import os
-from typing import Dict
+from typing import Dict, List, Optional
 
 import numpy as np
 
@@ -47,12 +47,52 @@ def _print_scores(scores: dict):
         )
 
 
-def finalize_scores(player_histories: Dict[str, np.ndarray], test: bool = False):
-    scores = read_scores(player_histories, test=test)
+def _print_timings(timings: dict):
+    print("\nTimings (ms per call: p50 / p90 / p99 / max):")
+    for name, timing in timings.items():
+        wall = timing["wall"][~np.isnan(timing["wall"])] * 1000
+        if len(wall) == 0:
+            print(f"{name}: no calls")
+            continue
+        p50, p90, p99 = np.percentile(wall, [50, 90, 99])
+        print(
+            f"{name}: {p50:.2f} / {p90:.2f} / {p99:.2f} / {wall.max():.2f} "
+            f"(calls: {len(wall)}, total: {wall.sum() / 1000:.2f}s, "
+            f"cpu: {np.nansum(timing['cpu']):.2f}s) "
+            f"[overruns: {timing['overruns']}]"
+        )
+
+
+def _add_round(scores: dict, player_histories: Dict[str, np.ndarray]):
     round_scores = {k: int(p[-1]) for k, p in player_histories.items()}
     round_peaks = {k: int(p.max()) for k, p in player_histories.items()}
     scores[str(len(scores))] = {
         k: {"score": round_scores[k], "peak": round_peaks[k]} for k in player_histories
     }
+
+
+def finalize_scores(
+    player_histories: Dict[str, np.ndarray],
+    test: bool = False,
+    timings: Optional[Dict[str, dict]] = None,
+):
+    finalize_rounds([player_histories], test=test, timings=timings)
+
+
+def finalize_rounds(
+    rounds: List[Dict[str, np.ndarray]],
+    test: bool = False,
+    timings: Optional[Dict[str, dict]] = None,
+):
+    """
+    Add several rounds to the scores, one after the other, as if
+    ``finalize_scores`` had been called after each of them.
+    """
+    scores = read_scores(rounds[0], test=test)
+    for player_histories in rounds:
+        _add_round(scores, player_histories)
     _print_scores(scores)
+    if timings is not None:
+        _print_timings(timings)
     _write_scores(scores)
+    return scores
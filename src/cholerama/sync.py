@@ -0,0 +1,73 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+class FrameExchange:
+    """
+    Hands complete iterations of the board from the engine to the viewer,
+    through three frames in shared memory. The engine copies each new iteration
+    into a frame that is neither the latest one nor the one being read, so that
+    neither side ever waits for the other.
+
+    Each frame also has a sequence number, which is odd while the frame is
+    being written (a seqlock). The viewer checks that it did not change while
+    it was copying the frame, so that it never shows a torn frame.
+
+    Parameters
+    ----------
+    buffers:
+        The arrays created by ``allocate`` (usually views of shared memory).
+    """
+
+    def __init__(self, buffers: Dict[str, np.ndarray]):
+        self.frames = buffers["frames"]
+        self.sequence = buffers["frame_sequence"]
+        self.iterations = buffers["frame_iterations"]
+        self.latest = buffers["frame_latest"]
+        self.reading = buffers["frame_reading"]
+
+    @staticmethod
+    def allocate(shape: Tuple[int, int], dtype: np.dtype) -> Dict[str, np.ndarray]:
+        return {
+            "frames": np.zeros((3,) + shape, dtype=dtype),
+            "frame_sequence": np.zeros(3, dtype=np.int64),
+            "frame_iterations": np.zeros(3, dtype=int),
+            "frame_latest": np.zeros(1, dtype=int),
+            "frame_reading": np.full(1, -1, dtype=int),
+        }
+
+    def publish(self, board: np.ndarray, it: int):
+        """
+        Make ``board`` the latest frame, for iteration ``it`` (engine side).
+        """
+        k = next(k for k in range(3) if k not in (self.latest[0], self.reading[0]))
+        self.sequence[k] += 1
+        self.frames[k] = board
+        self.iterations[k] = it
+        self.sequence[k] += 1
+        self.latest[0] = k
+
+    def iteration(self) -> int:
+        """
+        Iteration of the latest frame.
+        """
+        return int(self.iterations[self.latest[0]])
+
+    def read(self, out: np.ndarray) -> Optional[int]:
+        """
+        Copy the latest frame into ``out`` (viewer side), and return its
+        iteration, or None if the frame was being written.
+        """
+        k = int(self.latest[0])
+        sequence = self.sequence[k]
+        if sequence % 2:
+            return None
+        self.reading[0] = k
+        out[...] = self.frames[k]
+        it = int(self.iterations[k])
+        complete = self.sequence[k] == sequence
+        self.reading[0] = -1
+        return it if complete else None
@@ -1,13 +1,12 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
 from multiprocessing.shared_memory import SharedMemory
-from typing import Tuple, Union
+from typing import Optional, Tuple, Union
 
-import matplotlib.colors as mcolors
 import numpy as np
-from matplotlib import colormaps
 
-from . import config
+from .config import Config
+from .config import config as default_config
 
 
 def array_from_shared_mem(
@@ -20,17 +19,68 @@ def array_from_shared_mem(
     return arr
 
 
+def board_dtype(nplayers: int) -> np.dtype:
+    """
+    Smallest unsigned integer type that can hold all the player numbers.
+    """
+    return np.dtype(np.uint8 if nplayers <= np.iinfo(np.uint8).max else np.uint16)
+
+
+# The colors of the matplotlib tab20 colormap, dark shades first: the default
+# player colors do not need matplotlib
+COLORS = [
+    "#1f77b4",
+    "#ff7f0e",
+    "#2ca02c",
+    "#d62728",
+    "#9467bd",
+    "#8c564b",
+    "#e377c2",
+    "#7f7f7f",
+    "#bcbd22",
+    "#17becf",
+    "#aec7e8",
+    "#ffbb78",
+    "#98df8a",
+    "#ff9896",
+    "#c5b0d5",
+    "#c49c94",
+    "#f7b6d2",
+    "#c7c7c7",
+    "#dbdb8d",
+    "#9edae5",
+]
+
+
 def make_color(c: Union[int, str]) -> str:
-    tab20 = colormaps["tab20"]
-    color_list = [tab20(i * 2) for i in range(10)] + [
-        tab20(i * 2 + 1) for i in range(10)
-    ]
     if isinstance(c, int):
-        c = color_list[c % len(color_list)]
+        return COLORS[c % len(COLORS)]
+    # Imported here, so that matplotlib is only loaded for the colors chosen by
+    # the bots
+    import matplotlib.colors as mcolors
+
     return mcolors.to_hex(c)
 
 
-def make_starting_positions(n, rng) -> list:
+def make_lut(colors: list) -> np.ndarray:
+    """
+    RGBA lookup table of the board values: black for empty cells, then the
+    colors of the players.
+    """
+    import matplotlib.colors as mcolors
+
+    rgba = np.array([mcolors.to_rgba(c) for c in ["black"] + list(colors)])
+    return (rgba * 255).round().astype(np.uint8)
+
+
+def make_starting_positions(n, rng, config: Optional[Config] = None) -> list:
+    if config is None:
+        config = default_config
+    if n > config.max_players:
+        raise ValueError(
+            f"Too many players: {n} > {config.max_players}, the number of patches "
+            f"{config.npatches}."
+        )
     # Possible starting row and column as tuples
     inds = [
         (j, i) for j in range(config.npatches[0]) for i in range(config.npatches[1])
@@ -0,0 +1,125 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import importlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Union
+
+import numba
+import numpy as np
+
+from .engine import Engine, setup
+from .scores import finalize_rounds
+from .workers import _context
+
+
+def _module_name(bot) -> str:
+    return bot if isinstance(bot, str) else bot.__name__
+
+
+def _init_worker(threads: int):
+    numba.set_num_threads(threads)
+
+
+def _play_round(bots, iterations: int, seed: np.random.SeedSequence, kwargs: dict):
+    # Modules cannot be sent to other processes, so the bots are imported again
+    if isinstance(bots, dict):
+        bots = {name: importlib.import_module(bot) for name, bot in bots.items()}
+    else:
+        bots = [importlib.import_module(bot) for bot in bots]
+    buffers, players, dict_of_bots = setup(
+        bots=bots, iterations=iterations, seed=seed, config=kwargs.get("config")
+    )
+    eng = Engine(
+        bots=dict_of_bots,
+        players=players,
+        iterations=iterations,
+        buffers=buffers,
+        **kwargs,
+    )
+    eng.run_round()
+    results = {"seed": seed.entropy, "spawn_key": seed.spawn_key}
+    for i, name in enumerate(players):
+        results[f"{name}_history"] = eng.player_histories[i]
+        results[f"{name}_stats"] = eng.player_stats[:, i]
+    return results, eng.timings()
+
+
+def tournament(
+    *,
+    bots: Union[list, dict],
+    iterations: int,
+    rounds: int = 8,
+    seed: Optional[int] = None,
+    processes: Optional[int] = None,
+    test: bool = True,
+    **kwargs,
+) -> dict:
+    """
+    Play several headless rounds in parallel, and merge their results into a
+    single scoreboard (in the same way as playing the rounds one after another).
+
+    Parameters
+    ----------
+    bots:
+        The bots, as a list of modules (or module names), or a dict of name:
+        module. The modules must be importable by name in the worker processes.
+    iterations:
+        Number of iterations of each round.
+    rounds:
+        Number of rounds to play.
+    seed:
+        Seed of the tournament. The seed of each round is spawned from it, so
+        that it does not depend on the number of processes.
+    processes:
+        Number of rounds played at the same time. Defaults to the number of
+        cores (or of rounds if smaller). The cores are split between these
+        processes for the numba threads.
+    test:
+        If ``False``, the scores are added to the ones in ``scores.json``.
+    **kwargs:
+        Other arguments given to the ``Engine`` of each round (including the
+        ``config`` of the games).
+
+    Returns
+    -------
+    A dict with the merged ``scores``, and the histories and stats of the
+    players in each of the ``rounds`` (with the seed of the round).
+    """
+    if isinstance(bots, dict):
+        bots = {name: _module_name(bot) for name, bot in bots.items()}
+    else:
+        bots = [_module_name(bot) for bot in bots]
+    seeds = np.random.SeedSequence(seed).spawn(rounds)
+    cores = os.cpu_count() or 1
+    if processes is None:
+        processes = min(rounds, cores)
+    threads = max(1, min(cores // processes, numba.config.NUMBA_NUM_THREADS))
+
+    # As for the workers of the games, the rounds are not played in processes
+    # forked from this one, which may already have started the numba threads
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=_context,
+        initializer=_init_worker,
+        initargs=(threads,),
+    ) as pool:
+        futures = [pool.submit(_play_round, bots, iterations, s, kwargs) for s in seeds]
+        played = [future.result() for future in futures]
+
+    results = [r for r, _ in played]
+    names = [key[: -len("_history")] for key in results[0] if key.endswith("_history")]
+    timings = {
+        name: {
+            "wall": np.concatenate([t[name]["wall"] for _, t in played]),
+            "cpu": np.concatenate([t[name]["cpu"] for _, t in played]),
+            "overruns": sum(t[name]["overruns"] for _, t in played),
+        }
+        for name in names
+    }
+    scores = finalize_rounds(
+        [{name: r[f"{name}_history"] for name in names} for r in results],
+        test=test,
+        timings=timings,
+    )
+    return {"scores": scores, "rounds": results}
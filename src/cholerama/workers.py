@@ -0,0 +1,243 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import time
+from multiprocessing import Pipe, get_all_start_methods, get_context
+from multiprocessing.connection import Connection
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numba
+import numpy as np
+
+from .analysis import BoardAnalysis
+from .compute import evolve_strip, load_kernels
+from .tools import array_from_shared_mem
+
+# The worker processes are never forked from the engine: once a process has run
+# a kernel, the numba threads are started and do not survive a fork. They are
+# forked from a clean server process instead (which imports this module once, so
+# that the workers start quickly), or spawned where there is no such server. As
+# with any spawned process, the bots must be picklable, and a script that uses
+# workers must be guarded by ``if __name__ == "__main__":``.
+if "forkserver" in get_all_start_methods():
+    _context = get_context("forkserver")
+    _context.set_forkserver_preload([__name__])
+else:
+    _context = get_context("spawn")
+
+
+def _serve(
+    bot: Any,
+    patch_bounds: Dict[str, int],
+    boards: Sequence,
+    conn: Connection,
+    safe: bool,
+    patches: Optional[Dict[int, Dict[str, int]]],
+):
+    boards = [array_from_shared_mem(*board) for board in boards]
+    for board in boards:
+        board.setflags(write=False)
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        it, index, tokens = message
+        board = boards[index]
+        args = {
+            "iteration": it,
+            "board": board,
+            "patch": board[
+                patch_bounds["ymin"] : patch_bounds["ymax"],
+                patch_bounds["xmin"] : patch_bounds["xmax"],
+            ],
+            "tokens": tokens,
+        }
+        if patches is not None:
+            args["analysis"] = BoardAnalysis(board, patches)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            ok, result = True, bot.iterate(**args)
+        except Exception as error:
+            ok, result = safe, None if safe else error
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        conn.send((ok, result, wall, cpu))
+    conn.close()
+
+
+class BotWorker:
+    """
+    Runs a bot in its own process. The bot reads the boards through read-only
+    views of the shared memory, so that only the iteration number and tokens
+    are sent to the process, and only the reply of the bot (with the wall and
+    CPU time it took) is sent back.
+
+    Parameters
+    ----------
+    bot:
+        The bot instance.
+    patch_bounds:
+        The bounds of the patch of the player.
+    boards:
+        The ``(shared_mem, dtype, shape)`` of the two boards.
+    safe:
+        Ignore the errors raised by the bot instead of raising them in the engine.
+    patches:
+        The patch bounds of all the players, by player number, to hand a
+        ``BoardAnalysis`` to the bot (computed in the bot process). ``None`` if
+        the bot does not want one.
+    """
+
+    def __init__(
+        self,
+        bot: Any,
+        patch_bounds: Dict[str, int],
+        boards: Sequence,
+        safe: bool,
+        patches: Optional[Dict[int, Dict[str, int]]] = None,
+    ):
+        self.connection, child = Pipe()
+        self.process = _context.Process(
+            target=_serve,
+            args=(bot, patch_bounds, boards, child, safe, patches),
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+        # Iteration of the request the bot is still working on, if any
+        self.busy = None
+
+    def request(self, it: int, index: int, tokens: int):
+        """
+        Ask the bot to iterate on the board ``index`` (0: board_old, 1: board_new).
+        """
+        self.connection.send((it, index, tokens))
+        self.busy = it
+
+    def poll(self, timeout: Optional[float] = 0) -> bool:
+        """
+        Wait at most ``timeout`` seconds for the reply to the last request.
+        """
+        return self.connection.poll(timeout)
+
+    def reply(self) -> Tuple[Any, float, float]:
+        """
+        Wait for the reply of the bot to the last request. Returns the reply, and
+        the wall and CPU time the bot took.
+        """
+        ok, result, wall, cpu = self.connection.recv()
+        self.busy = None
+        if not ok:
+            raise result
+        return result, wall, cpu
+
+    def close(self):
+        if self.busy is None:
+            self.connection.send(None)
+        else:
+            # The bot is stuck in a request, there is no point waiting for it
+            self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+
+def _serve_strip(
+    boards: Sequence,
+    rows: Tuple[int, int],
+    patch_owners: Tuple,
+    tallies: Tuple,
+    hashes: Tuple,
+    strip: int,
+    threads: int,
+    conn: Connection,
+):
+    numba.set_num_threads(threads)
+    boards = [array_from_shared_mem(*board) for board in boards]
+    patch_owners = array_from_shared_mem(*patch_owners)
+    tally = array_from_shared_mem(*tallies)[strip]
+    hashes = array_from_shared_mem(*hashes)
+    # Load the kernel and start the threads on a tiny scratch board
+    load_kernels(boards[0].dtype, ["strip"])
+    scratch = np.zeros((4, 64), dtype=boards[0].dtype)
+    owners = np.zeros((1, 1), dtype=patch_owners.dtype)
+    evolve_strip(scratch, scratch.copy(), 0, 4, owners, tally.copy())
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        try:
+            hashes[strip] = evolve_strip(
+                boards[message], boards[1 - message], *rows, patch_owners, tally
+            )
+            conn.send(None)
+        except Exception as error:
+            conn.send(error)
+    conn.close()
+
+
+class StripWorker:
+    """
+    Evolves a horizontal strip of the board in its own process. The two boards
+    live in shared memory, so that the rows just outside the strip (its halo)
+    are read directly from the neighbouring strips: once every strip has
+    finished a step, the new board is complete. The per-player tallies and the
+    change in the board hash of the strip are written to shared memory.
+
+    Parameters
+    ----------
+    boards:
+        The ``(shared_mem, dtype, shape)`` of the two boards.
+    rows:
+        The first and last (excluded) rows of the strip.
+    patch_owners:
+        The ``(shared_mem, dtype, shape)`` of the player number owning each
+        starting patch.
+    tallies:
+        The ``(shared_mem, dtype, shape)`` of the tallies of all the strips, of
+        shape (strips, 4, players + 1).
+    hashes:
+        The ``(shared_mem, dtype, shape)`` of the hash changes of all the strips.
+    strip:
+        The number of the strip.
+    threads:
+        The number of numba threads of the process.
+    """
+
+    def __init__(
+        self,
+        boards: Sequence,
+        rows: Tuple[int, int],
+        patch_owners: Tuple,
+        tallies: Tuple,
+        hashes: Tuple,
+        strip: int,
+        threads: int,
+    ):
+        self.connection, child = Pipe()
+        self.process = _context.Process(
+            target=_serve_strip,
+            args=(boards, rows, patch_owners, tallies, hashes, strip, threads, child),
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+
+    def request(self, index: int):
+        """
+        Evolve the strip from the board ``index`` (0: board_old, 1: board_new)
+        into the other one.
+        """
+        self.connection.send(index)
+
+    def wait(self):
+        """
+        Wait for the strip to be evolved.
+        """
+        error = self.connection.recv()
+        if error is not None:
+            raise error
+
+    def close(self):
+        self.connection.send(None)
+        self.process.join()
+        self.connection.close()